@@ -3,21 +3,53 @@ Dynamic measure discovery and caching system
 Bridges generic measure names with actual Power BI model measures
 """
 
-import json
+import logging
 import os
+import re
+import asyncio
 import base64
+import copy
+import hashlib
 from pathlib import Path
-from typing import Dict, List, Optional, Tuple, Any
+from types import MappingProxyType
+from typing import Dict, List, Mapping, Optional, Tuple, Any
 from datetime import datetime, timedelta
-from dataclasses import dataclass
+from dataclasses import dataclass, asdict, field
 
 from .constants import FINANCIAL_MEASURES
 from .settings import settings
 from ..utils.logging import mcp_logger
+from ..utils.serialization import file_fingerprint, json_dumps_bytes, json_loads, write_json_atomic
 from ..powerbi.client import get_powerbi_client
 
+# Column keys of the __def_Measures DAX result rows
+_MEASURE_NAME_KEY = '__def_Measures[Name]'
+_MEASURE_DESC_KEY = '__def_Measures[Description]'
 
-@dataclass
+# Measure categorization keywords (substring matched against the lowercased name).
+# Tuples keep alias order stable in the categorization output.
+_REVENUE_KEYWORDS = ('revenue', 'sales', 'income', 'turnover', 'receipts')
+_PROFIT_KEYWORDS = ('profit', 'margin', 'earnings', 'ebit')  # 'ebit' also matches 'ebitda'
+_CASH_KEYWORDS = ('cash', 'liquidity')
+_ASSET_KEYWORDS = ('asset',)  # 'asset' also matches 'assets'
+_DEBT_KEYWORDS = ('debt', 'liabilities')
+_EQUITY_KEYWORDS = ('equity', 'shareholders')
+
+
+def _keyword_pattern(keywords: Tuple[str, ...]) -> 're.Pattern[str]':
+    """Compile keywords into one alternation so a category check is a single C-level scan"""
+    return re.compile('|'.join(re.escape(keyword) for keyword in keywords))
+
+
+_REVENUE_RE = _keyword_pattern(_REVENUE_KEYWORDS)
+_PROFIT_RE = _keyword_pattern(_PROFIT_KEYWORDS)
+_CASH_RE = _keyword_pattern(_CASH_KEYWORDS)
+_ASSET_RE = _keyword_pattern(_ASSET_KEYWORDS)
+_DEBT_RE = _keyword_pattern(_DEBT_KEYWORDS)
+_EQUITY_RE = _keyword_pattern(_EQUITY_KEYWORDS)
+
+
+@dataclass(slots=True)
 class DiscoveredMeasure:
     """Represents a discovered measure from Power BI model"""
     name: str
@@ -25,10 +57,35 @@ class DiscoveredMeasure:
     category: str = "unknown"
     confidence: float = 0.0
     aliases: List[str] = None
+    name_lower: str = field(init=False, repr=False, compare=False)
+    recommended: Dict[str, Any] = field(init=False, repr=False, compare=False)
+    summary: Dict[str, Any] = field(init=False, repr=False, compare=False)
     
     def __post_init__(self):
         if self.aliases is None:
             self.aliases = []
+        self.name_lower = self.name.lower()
+        # Pre-formatted entry for the context builder's recommended measures
+        self.recommended = {
+            'category': self.category,
+            'confidence': int(self.confidence * 100),
+            'suggested_use': f"Use [{self.name}] for {self.category} queries"
+        }
+        # Pre-built entry for measures by category and the updated constants
+        self.summary = {
+            'name': self.name,
+            'category': self.category,
+            'confidence': self.confidence,
+            'aliases': self.aliases
+        }
+    
+    def to_dict(self) -> Dict[str, Any]:
+        """Serializable representation (derived fields excluded)"""
+        data = asdict(self)
+        del data['name_lower']
+        del data['recommended']
+        del data['summary']
+        return data
 
 
 class DynamicMeasureManager:
@@ -41,6 +98,11 @@ class DynamicMeasureManager:
         self._cached_measures: Dict[str, DiscoveredMeasure] = {}
         self._measure_mappings: Dict[str, str] = {}
         self._last_discovery: Optional[datetime] = None
+        self._cache_sha: Optional[bytes] = None  # Digest of measures last written to/read from disk
+        self._cache_version = 0  # Bumped whenever measures or mappings change
+        self._updated_constants_cache: Optional[Tuple[Tuple[int, Optional[datetime]], Dict[str, Any]]] = None
+        # (mtime_ns, size) of the mappings file as last read or written, for the source fingerprint
+        self._mappings_stat: Optional[Tuple[int, int]] = None
         
         # Load cached data on initialization
         self._load_cache()
@@ -49,12 +111,16 @@ class DynamicMeasureManager:
     def _load_cache(self) -> None:
         """Load cached measures from file"""
         try:
-            if self.cache_file.exists():
-                with open(self.cache_file, 'r') as f:
-                    cache_data = json.load(f)
+            cache_stat = file_fingerprint(self.cache_file)
+            if cache_stat is not None:
+                cache_data = json_loads(self.cache_file.read_bytes())
                 
-                # Check if cache is still valid
-                cache_timestamp = datetime.fromisoformat(cache_data.get('timestamp', '1970-01-01'))
+                # Check if cache is still valid - unchanged rediscoveries only touch the file,
+                # so its mtime can be newer than the stored timestamp
+                cache_timestamp = max(
+                    datetime.fromisoformat(cache_data.get('timestamp', '1970-01-01')),
+                    datetime.fromtimestamp(cache_stat[0] / 1_000_000_000)
+                )
                 if datetime.now() - cache_timestamp < timedelta(hours=self.cache_expiry_hours):
                     measures_data = cache_data.get('measures', {})
                     self._cached_measures = {
@@ -62,42 +128,64 @@ class DynamicMeasureManager:
                         for name, data in measures_data.items()
                     }
                     self._last_discovery = cache_timestamp
+                    self._cache_version += 1
+                    self._cache_sha = self._get_measures_digest(measures_data)
                     mcp_logger.info(f"Loaded {len(self._cached_measures)} cached measures")
                 else:
                     mcp_logger.info("Measure cache expired, will refresh on next discovery")
         except Exception as e:
             mcp_logger.warning(f"Could not load measure cache: {e}")
     
+    @staticmethod
+    def _get_measures_digest(measures_data: Dict[str, Any]) -> bytes:
+        """Hash serialized measures for change detection"""
+        return hashlib.blake2b(json_dumps_bytes(measures_data, sort_keys=True), digest_size=16).digest()
+    
     def _save_cache(self) -> None:
-        """Save measures to cache file"""
+        """Save measures to cache file, bumping the cache version only if they changed"""
         try:
+            measures_data = {
+                name: measure.to_dict()
+                for name, measure in self._cached_measures.items()
+            }
+            
+            # Skip the rewrite when discovery returned exactly what is already cached,
+            # but touch the file so the confirmed cache does not expire after a restart
+            digest = self._get_measures_digest(measures_data)
+            if digest != self._cache_sha:
+                self._cache_version += 1
+            elif self._touch_cache_file():
+                mcp_logger.debug("Measure cache unchanged, skipping write")
+                return
+            
             cache_data = {
                 'timestamp': datetime.now().isoformat(),
-                'measures': {
-                    name: {
-                        'name': measure.name,
-                        'formula': measure.formula,
-                        'category': measure.category,
-                        'confidence': measure.confidence,
-                        'aliases': measure.aliases
-                    }
-                    for name, measure in self._cached_measures.items()
-                }
+                'measures': measures_data
             }
             
-            with open(self.cache_file, 'w') as f:
-                json.dump(cache_data, f, indent=2)
+            write_json_atomic(self.cache_file, cache_data)
+            self._cache_sha = digest
             
             mcp_logger.info(f"Saved {len(self._cached_measures)} measures to cache")
         except Exception as e:
             mcp_logger.error(f"Could not save measure cache: {e}")
     
+    def _touch_cache_file(self) -> bool:
+        """Refresh the cache file mtime; False if the file is gone and must be rewritten"""
+        try:
+            os.utime(self.cache_file)
+        except FileNotFoundError:
+            return False
+        return True
+    
     def _load_mappings(self) -> None:
         """Load custom measure mappings"""
         try:
-            if self.mapping_file.exists():
-                with open(self.mapping_file, 'r') as f:
-                    self._measure_mappings = json.load(f)
+            mappings_stat = file_fingerprint(self.mapping_file)
+            if mappings_stat is not None:
+                self._measure_mappings = json_loads(self.mapping_file.read_bytes())
+                self._mappings_stat = mappings_stat
+                self._cache_version += 1
                 mcp_logger.info(f"Loaded {len(self._measure_mappings)} custom measure mappings")
         except Exception as e:
             mcp_logger.warning(f"Could not load measure mappings: {e}")
@@ -108,14 +196,12 @@ class DynamicMeasureManager:
         formula_lower = formula.lower()
         
         # Revenue detection
-        revenue_keywords = ['revenue', 'sales', 'income', 'turnover', 'receipts']
-        if any(keyword in name_lower for keyword in revenue_keywords):
-            aliases = [kw for kw in revenue_keywords if kw in name_lower]
+        if _REVENUE_RE.search(name_lower):
+            aliases = [kw for kw in _REVENUE_KEYWORDS if kw in name_lower]
             return 'revenue', 0.9, aliases
         
         # Profit detection
-        profit_keywords = ['profit', 'margin', 'earnings', 'ebitda', 'ebit']
-        if any(keyword in name_lower for keyword in profit_keywords):
+        if _PROFIT_RE.search(name_lower):
             if 'gross' in name_lower:
                 return 'gross_profit', 0.85, ['gross profit', 'gp']
             elif 'ebitda' in name_lower:
@@ -125,9 +211,9 @@ class DynamicMeasureManager:
             return 'profit', 0.7, []
         
         # Cash and assets
-        if any(keyword in name_lower for keyword in ['cash', 'liquidity']):
+        if _CASH_RE.search(name_lower):
             return 'cash', 0.85, ['cash', 'liquidity']
-        if any(keyword in name_lower for keyword in ['asset', 'assets']):
+        if _ASSET_RE.search(name_lower):
             if 'total' in name_lower:
                 return 'total_assets', 0.8, ['total assets']
             elif 'fixed' in name_lower or 'ppe' in name_lower:
@@ -137,16 +223,44 @@ class DynamicMeasureManager:
         # Working capital and debt
         if 'working capital' in name_lower or 'wc' in name_lower:
             return 'working_capital', 0.9, ['working capital', 'wc']
-        if any(keyword in name_lower for keyword in ['debt', 'liabilities']):
+        if _DEBT_RE.search(name_lower):
             return 'net_debt', 0.7, ['debt', 'liabilities']
         
         # Equity
-        if any(keyword in name_lower for keyword in ['equity', 'shareholders']):
+        if _EQUITY_RE.search(name_lower):
             return 'equity', 0.8, ['equity', 'shareholders equity']
         
         # Default unknown category
         return 'unknown', 0.1, []
     
+    def _ingest_rows(self, rows: List[Dict[str, Any]]) -> Dict[str, DiscoveredMeasure]:
+        """Build discovered measures from __def_Measures result rows"""
+        # Only include measures that have "_AI" in their actual measure name
+        # This indicates they are designed for AI use. Filter in one pass
+        # so only the (usually few) AI rows pay for categorization.
+        ai_rows = [row for row in rows if "_AI" in (row.get(_MEASURE_NAME_KEY) or '')]
+        mcp_logger.debug(f"⏭️ Skipping {len(rows) - len(ai_rows)} non-AI measures")
+        
+        discovered_measures = {}
+        for row in ai_rows:
+            measure_name = row[_MEASURE_NAME_KEY]
+            description = row.get(_MEASURE_DESC_KEY) or ''
+            mcp_logger.debug(f"✅ AI-enabled measure found: {measure_name}")
+            
+            # Categorize measure based on name and description
+            combined_text = measure_name.lower() + ' ' + description.lower()
+            category, confidence, aliases = self._categorize_measure(measure_name, combined_text)
+            
+            discovered_measures[measure_name] = DiscoveredMeasure(
+                name=measure_name,
+                formula=description,  # Use description as formula placeholder
+                category=category,
+                confidence=confidence,
+                aliases=aliases
+            )
+        
+        return discovered_measures
+    
     def discover_measures_from_model(self, 
                                    workspace_name: str = None, 
                                    dataset_name: str = None,
@@ -169,26 +283,10 @@ class DynamicMeasureManager:
             discovered_measures = {}
             
             try:
-                # Use the 4 DAX queries to understand model structure
-                mcp_logger.info("Using new discovery method with 4 DAX queries")
-                
-                # Query 1: Get Tables
-                tables_query = """
-                EVALUATE CALCULATETABLE( 
-                    SELECTCOLUMNS(__def_Tables, [Name], [Description]), 
-                    NOT(ISBLANK(__def_Tables[Description])) 
-                )
-                """
+                # Only the measures query is needed here; table/column schema is
+                # discovered separately by the model schema manager
+                mcp_logger.info("Using DAX discovery method for measures")
                 
-                # Query 2: Get Columns  
-                columns_query = """
-                EVALUATE CALCULATETABLE( 
-                    SELECTCOLUMNS(__def_Columns, [Table], [Name], [Description]), 
-                    NOT(ISBLANK(__def_Columns[Description])) 
-                )
-                """
-                
-                # Query 3: Get Measures (main query for our purpose)
                 measures_query = """
                 EVALUATE CALCULATETABLE( 
                     SELECTCOLUMNS(__def_Measures, [Name], [Description], [DisplayFolder]), 
@@ -196,22 +294,16 @@ class DynamicMeasureManager:
                 )
                 """
                 
-                # Query 4: Get Relationships
-                relationships_query = """
-                EVALUATE CALCULATETABLE(
-                    SELECTCOLUMNS(__def_Relationships, [Relationship]),
-                    __def_Relationships[IsActive] = TRUE() 
-                )
-                """
-                
-                # Execute measures query (most important for this function)
+                # Execute measures query
                 measures_result = client.execute_dax_query(
                     workspace['id'], dataset['id'], measures_query
                 )
                 
                 # Parse measures from result - Handle both result formats
-                mcp_logger.info(f"Measures result format: {type(measures_result)}")
-                mcp_logger.info(f"Measures result sample: {str(measures_result)[:500]}...")
+                debug_enabled = mcp_logger.is_enabled_for(logging.DEBUG)
+                if debug_enabled:
+                    mcp_logger.debug(f"Measures result format: {type(measures_result)}")
+                    mcp_logger.debug(f"Measures result sample: {str(measures_result)[:500]}...")
                 
                 # Try the custom DAX result format first (list with rows)
                 if isinstance(measures_result, list) and len(measures_result) > 0:
@@ -219,95 +311,21 @@ class DynamicMeasureManager:
                     if 'rows' in first_result:
                         rows = first_result['rows']
                         mcp_logger.info(f"✅ Found {len(rows)} total measures using custom DAX format")
-                        
-                        for row in rows:
-                            measure_name = row.get('__def_Measures[Name]', '')
-                            description = row.get('__def_Measures[Description]', '')
-                            display_folder = row.get('__def_Measures[DisplayFolder]', '')
-                            
-                            mcp_logger.debug(f"Processing measure: {measure_name}")
-                            
-                            # Only include measures that have "_AI" in their actual measure name
-                            # This indicates they are designed for AI use
-                            if measure_name and "_AI" in measure_name:
-                                mcp_logger.debug(f"✅ AI-enabled measure found: {measure_name}")
-                                
-                                # Categorize measure based on name and description
-                                combined_text = f"{measure_name} {description}".lower()
-                                category, confidence, aliases = self._categorize_measure(measure_name, combined_text)
-                                
-                                discovered_measures[measure_name] = DiscoveredMeasure(
-                                    name=measure_name,
-                                    formula=description,  # Use description as formula placeholder
-                                    category=category,
-                                    confidence=confidence,
-                                    aliases=aliases
-                                )
-                            elif measure_name:
-                                mcp_logger.debug(f"⏭️ Skipping non-AI measure: {measure_name}")
-                        
+                        discovered_measures = self._ingest_rows(rows)
                         mcp_logger.info(f"✅ Successfully parsed {len(discovered_measures)} AI-enabled measures from custom DAX format")
                     else:
                         mcp_logger.warning(f"❌ No 'rows' key found in first result: {first_result}")
-                else:
-                    mcp_logger.warning(f"❌ Result is not a list or is empty: {measures_result}")
                 
                 # Fallback to original result format
-                if not discovered_measures and isinstance(measures_result, dict) and 'results' in measures_result:
+                elif isinstance(measures_result, dict) and 'results' in measures_result:
                     tables = measures_result['results'][0].get('tables', [])
                     if tables and 'rows' in tables[0]:
                         rows = tables[0]['rows']
                         mcp_logger.info(f"Found {len(rows)} total measures using original format")
-                        
-                        for row in rows:
-                            measure_name = row.get('__def_Measures[Name]', '')
-                            description = row.get('__def_Measures[Description]', '')
-                            display_folder = row.get('__def_Measures[DisplayFolder]', '')
-                            
-                            # Only include measures that have "_AI" in their actual measure name
-                            # This indicates they are designed for AI use
-                            if measure_name and "_AI" in measure_name:
-                                mcp_logger.debug(f"✅ AI-enabled measure found: {measure_name}")
-                                
-                                # Categorize measure based on name and description
-                                combined_text = f"{measure_name} {description}".lower()
-                                category, confidence, aliases = self._categorize_measure(measure_name, combined_text)
-                                
-                                discovered_measures[measure_name] = DiscoveredMeasure(
-                                    name=measure_name,
-                                    formula=description,  # Use description as formula placeholder
-                                    category=category,
-                                    confidence=confidence,
-                                    aliases=aliases
-                                )
-                            elif measure_name:
-                                mcp_logger.debug(f"⏭️ Skipping non-AI measure: {measure_name}")
+                        discovered_measures = self._ingest_rows(rows)
                 else:
                     mcp_logger.warning(f"Unexpected measures result format: {type(measures_result)} - {str(measures_result)[:200]}...")
                 
-                # Optionally execute other queries for context (but not strictly needed for measures)
-                try:
-                    # Execute tables query for additional context
-                    tables_result = client.execute_dax_query(
-                        workspace['id'], dataset['id'], tables_query
-                    )
-                    mcp_logger.debug(f"Tables query executed successfully")
-                    
-                    # Execute columns query for additional context
-                    columns_result = client.execute_dax_query(
-                        workspace['id'], dataset['id'], columns_query  
-                    )
-                    mcp_logger.debug(f"Columns query executed successfully")
-                    
-                    # Execute relationships query for additional context
-                    relationships_result = client.execute_dax_query(
-                        workspace['id'], dataset['id'], relationships_query
-                    )
-                    mcp_logger.debug(f"Relationships query executed successfully")
-                    
-                except Exception as e:
-                    mcp_logger.warning(f"Additional discovery queries failed (non-critical): {e}")
-                
                 self._cached_measures = discovered_measures
                 self._last_discovery = datetime.now()
                 self._save_cache()
@@ -316,7 +334,8 @@ class DynamicMeasureManager:
                     mcp_logger.info(f"✅ Successfully discovered {len(discovered_measures)} AI-enabled measures using new DAX queries")
                 else:
                     mcp_logger.warning("No AI-enabled measures discovered from DAX queries (measures without '_AI' in description were filtered out)")
-                    mcp_logger.debug(f"Raw measures result was: {measures_result}")
+                    if debug_enabled:
+                        mcp_logger.debug(f"Raw measures result was: {measures_result}")
                 return discovered_measures
                 
             except Exception as e:
@@ -327,6 +346,16 @@ class DynamicMeasureManager:
             mcp_logger.error(f"Failed to discover measures: {e}")
             return {}
     
+    async def discover_measures_from_model_async(self, 
+                                               workspace_name: str = None, 
+                                               dataset_name: str = None,
+                                               force_refresh: bool = False) -> Dict[str, DiscoveredMeasure]:
+        """Run measure discovery (DAX request and cache write) in a worker thread
+        so async MCP handlers do not block the event loop"""
+        return await asyncio.to_thread(
+            self.discover_measures_from_model, workspace_name, dataset_name, force_refresh
+        )
+    
     def get_measure_mapping(self, generic_name: str) -> Optional[str]:
         """Get actual measure name for a generic measure name"""
         
@@ -340,8 +369,9 @@ class DynamicMeasureManager:
                 return measure.name
         
         # 3. Check aliases
+        generic_lower = generic_name.lower()
         for measure in self._cached_measures.values():
-            if any(alias in generic_name.lower() for alias in measure.aliases):
+            if any(alias in generic_lower for alias in measure.aliases):
                 return measure.name
         
         # 4. Fallback to generic mapping from constants
@@ -350,15 +380,30 @@ class DynamicMeasureManager:
         
         return None
     
-    def get_all_discovered_measures(self) -> Dict[str, DiscoveredMeasure]:
-        """Get all discovered measures"""
-        return self._cached_measures.copy()
+    def get_mappings_count(self) -> int:
+        """Count generic financial measures that resolve to an actual measure name"""
+        # get_measure_mapping falls back to the constants for every generic name,
+        # so only an empty custom mapping leaves one unmapped
+        return sum(
+            1 for generic_name in FINANCIAL_MEASURES
+            if self._measure_mappings.get(generic_name, True)
+        )
+    
+    def get_source_fingerprint(self) -> Optional[str]:
+        """Fingerprint of the persisted measures and mappings, or None if measures are not cached"""
+        if self._cache_sha is None:
+            return None
+        return f"{self._cache_sha.hex()}:{self._mappings_stat}"
+    
+    def get_all_discovered_measures(self) -> Mapping[str, DiscoveredMeasure]:
+        """Get all discovered measures as a read-only view (no copy)"""
+        return MappingProxyType(self._cached_measures)
     
     def get_revenue_measures(self) -> List[str]:
         """Get all measures that appear to be revenue-related"""
         return [
             measure.name for measure in self._cached_measures.values()
-            if measure.category in ['revenue'] or 'revenue' in measure.name.lower()
+            if measure.category == 'revenue' or 'revenue' in measure.name_lower
         ]
     
     def get_high_confidence_measures(self, min_confidence: float = 0.7) -> Dict[str, DiscoveredMeasure]:
@@ -370,6 +415,13 @@ class DynamicMeasureManager:
     
     def create_updated_constants(self) -> Dict[str, Any]:
         """Create updated constants with discovered measures"""
+        # Result depends on measures, mappings and the discovery time - reuse it until any changes.
+        # Callers get a copy so they cannot mutate the memoized result
+        memo_key = (self._cache_version, self._last_discovery)
+        cached = self._updated_constants_cache
+        if cached and cached[0] == memo_key:
+            return copy.deepcopy(cached[1])
+        
         updated_measures = FINANCIAL_MEASURES.copy()
         
         # Update DAX references based on discovered measures
@@ -380,16 +432,10 @@ class DynamicMeasureManager:
                 updated_measures[generic_name]['dax'] = f'[{actual_measure}]'
                 updated_measures[generic_name]['discovered'] = True
         
-        return {
+        result = {
             'FINANCIAL_MEASURES': updated_measures,
             'DISCOVERED_MEASURES': {
-                name: {
-                    'name': measure.name,
-                    'category': measure.category,
-                    'confidence': measure.confidence,
-                    'aliases': measure.aliases
-                }
-                for name, measure in self._cached_measures.items()
+                name: measure.summary for name, measure in self._cached_measures.items()
             },
             'DISCOVERY_METADATA': {
                 'last_discovery': self._last_discovery.isoformat() if self._last_discovery else None,
@@ -398,14 +444,18 @@ class DynamicMeasureManager:
                 'revenue_measures': self.get_revenue_measures()
             }
         }
+        
+        self._updated_constants_cache = (memo_key, result)
+        return copy.deepcopy(result)
     
     def save_custom_mapping(self, generic_name: str, actual_measure_name: str) -> bool:
         """Save a custom mapping between generic and actual measure names"""
         try:
             self._measure_mappings[generic_name] = actual_measure_name
+            self._cache_version += 1
             
-            with open(self.mapping_file, 'w') as f:
-                json.dump(self._measure_mappings, f, indent=2)
+            write_json_atomic(self.mapping_file, self._measure_mappings)
+            self._mappings_stat = file_fingerprint(self.mapping_file)
             
             mcp_logger.info(f"Saved custom mapping: {generic_name} -> {actual_measure_name}")
             return True
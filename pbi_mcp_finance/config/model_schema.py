@@ -3,30 +3,82 @@ Model schema discovery and caching system
 Identifies actual table and column names in Power BI model
 """
 
-import json
+import re
 import base64
+import logging
+import threading
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from operator import itemgetter
 from pathlib import Path
-from typing import Dict, List, Optional, Set
+from types import MappingProxyType
+from typing import Any, Dict, List, Optional, Set, Tuple
 from datetime import datetime, timedelta
-from dataclasses import dataclass
+from dataclasses import dataclass, field
 
 from .settings import settings
 from ..utils.logging import mcp_logger
+from ..utils.exceptions import DAXQueryError
+from ..utils.serialization import file_fingerprint, json_loads, write_json_atomic
 from ..powerbi.client import get_powerbi_client
 
 
-@dataclass
+# Table categorization indicators, compiled once into single-pass alternations
+_FACT_NAME_RE = re.compile('journal|transaction|entry|line|fact')
+_DIMENSION_NAME_RE = re.compile('dim|_date|_period|account|contact|mapping')
+_VALUE_COLUMN_RE = re.compile('amount|value|quantity|balance')
+
+# Correct table names for commonly assumed names
+_TABLE_CORRECTIONS = MappingProxyType({
+    'date': '_Date',
+    'period': '_Period',
+    'scenario': '_Scenario',
+    'accounts': 'Accounts',
+    'journals': 'Journals',
+    'mapping': 'Mapping'
+})
+
+# DAX discovery row field accessors (a single C call per row)
+_table_row_fields = itemgetter('__def_Tables[Name]', '__def_Tables[Description]')
+_column_row_fields = itemgetter('__def_Columns[Table]', '__def_Columns[Name]')
+
+
+def _get_dax_rows(result: Any) -> List[Dict[str, Any]]:
+    """Get the row list from a DAX result in either the custom or the original format"""
+    # Custom DAX result format (list with rows)
+    if isinstance(result, list):
+        if result and 'rows' in result[0]:
+            return result[0]['rows']
+        return []
+    
+    # Original result format
+    if isinstance(result, dict) and 'results' in result:
+        tables = result['results'][0].get('tables', [])
+        if tables and 'rows' in tables[0]:
+            return tables[0]['rows']
+    return []
+
+
+@dataclass(slots=True, frozen=True)
 class TableSchema:
     """Represents discovered table schema"""
     name: str
     columns: List[str]
-    relationships: List[str] = None
+    relationships: List[str] = field(default_factory=list)
     is_fact_table: bool = False
     confidence: float = 0.0
+    columns_lower: Tuple[str, ...] = field(default=(), repr=False, compare=False)
+    name_lower: str = field(init=False, repr=False, compare=False)
     
     def __post_init__(self):
-        if self.relationships is None:
-            self.relationships = []
+        # Frozen, so the derived fields are set through object.__setattr__
+        object.__setattr__(self, 'name_lower', self.name.lower())
+        if not self.columns_lower:
+            object.__setattr__(self, 'columns_lower', tuple(col.lower() for col in self.columns))
+
+
+# (tables, lowered table name -> table name, lowered column name -> table names)
+_SchemaSnapshot = Tuple[Dict[str, TableSchema], Dict[str, str], Dict[str, List[str]]]
 
 
 class ModelSchemaManager:
@@ -35,31 +87,62 @@ class ModelSchemaManager:
     def __init__(self):
         self.cache_file = settings.script_dir / "model_schema_cache.json"
         self.cache_expiry_hours = 24
-        self._cached_tables: Dict[str, TableSchema] = {}
         self._last_discovery: Optional[datetime] = None
+        self._cached_model: Optional[Tuple[str, str]] = None  # (workspace, dataset) of cached tables
+        self._refresh_lock = threading.Lock()
+        self._refresh_in_progress = False
+        self._default_model: Optional[Tuple[Optional[str], Optional[str]]] = None
         
-        # Load cached data
-        self._load_cache()
+        # Tables and their case-insensitive lookup indexes, published as one tuple so
+        # a background refresh never pairs new tables with old indexes
+        self._schema: _SchemaSnapshot = ({}, {}, {})
+        
+        # Cached data is loaded on first access rather than at construction
+        self._loaded = False
+        self._load_lock = threading.Lock()
+    
+    @property
+    def _cached_tables(self) -> Dict[str, TableSchema]:
+        """Discovered tables, loading the cache file on first access"""
+        self._ensure_loaded()
+        return self._schema[0]
+    
+    @_cached_tables.setter
+    def _cached_tables(self, tables: Dict[str, TableSchema]) -> None:
+        self._schema = self._index_tables(tables)
+        self._loaded = True
+    
+    def _ensure_loaded(self) -> None:
+        """Load the cache file once, even with concurrent first callers"""
+        if self._loaded:
+            return
+        with self._load_lock:
+            if not self._loaded:
+                self._load_cache()
+                self._loaded = True
     
     def _load_cache(self) -> None:
         """Load cached schema from file"""
         try:
-            if self.cache_file.exists():
-                with open(self.cache_file, 'r') as f:
-                    cache_data = json.load(f)
-                
-                # Check if cache is still valid
-                cache_timestamp = datetime.fromisoformat(cache_data.get('timestamp', '1970-01-01'))
-                if datetime.now() - cache_timestamp < timedelta(hours=self.cache_expiry_hours):
-                    tables_data = cache_data.get('tables', {})
-                    self._cached_tables = {
-                        name: TableSchema(**data) 
-                        for name, data in tables_data.items()
-                    }
-                    self._last_discovery = cache_timestamp
-                    mcp_logger.info(f"Loaded {len(self._cached_tables)} cached table schemas")
-                else:
-                    mcp_logger.info("Model schema cache expired")
+            fingerprint = file_fingerprint(self.cache_file)
+            if fingerprint is None:
+                return
+            
+            # Check if cache is still valid from the file mtime, before parsing it
+            cache_timestamp = datetime.fromtimestamp(fingerprint[0] / 1e9)
+            if datetime.now() - cache_timestamp < timedelta(hours=self.cache_expiry_hours):
+                cache_data = json_loads(self.cache_file.read_bytes())
+                tables_data = cache_data.get('tables', {})
+                self._schema = self._index_tables({
+                    name: TableSchema(**data) 
+                    for name, data in tables_data.items()
+                })
+                self._last_discovery = cache_timestamp
+                if cache_data.get('workspace') and cache_data.get('dataset'):
+                    self._cached_model = (cache_data['workspace'], cache_data['dataset'])
+                mcp_logger.info(f"Loaded {len(self._schema[0])} cached table schemas")
+            else:
+                mcp_logger.info("Model schema cache expired")
         except Exception as e:
             mcp_logger.warning(f"Could not load schema cache: {e}")
     
@@ -67,7 +150,8 @@ class ModelSchemaManager:
         """Save schema to cache file"""
         try:
             cache_data = {
-                'timestamp': datetime.now().isoformat(),
+                'workspace': self._cached_model[0] if self._cached_model else None,
+                'dataset': self._cached_model[1] if self._cached_model else None,
                 'tables': {
                     name: {
                         'name': table.name,
@@ -80,43 +164,39 @@ class ModelSchemaManager:
                 }
             }
             
-            with open(self.cache_file, 'w') as f:
-                json.dump(cache_data, f, indent=2)
+            write_json_atomic(self.cache_file, cache_data)
             
             mcp_logger.info(f"Saved {len(self._cached_tables)} table schemas to cache")
         except Exception as e:
             mcp_logger.error(f"Could not save schema cache: {e}")
     
-    def _categorize_table(self, table_name: str, columns: List[str]) -> tuple[bool, float]:
-        """Determine if table is a fact table and confidence level"""
+    def _categorize_table(self, table_name: str, columns_lower: Tuple[str, ...]) -> tuple[bool, float]:
+        """Determine if table is a fact table and confidence level from lowercased column names"""
         name_lower = table_name.lower()
-        columns_lower = [col.lower() for col in columns]
-        
-        # Fact table indicators
-        fact_indicators = ['journal', 'transaction', 'entry', 'line', 'fact']
-        dimension_indicators = ['dim', '_date', '_period', 'account', 'contact', 'mapping']
-        
-        # Amount/value columns indicate fact table
-        value_columns = [col for col in columns_lower if any(
-            indicator in col for indicator in ['amount', 'value', 'quantity', 'balance']
-        )]
         
+        # Single pass over the columns: amount/value columns indicate a fact table,
         # ID columns indicate relationships
-        id_columns = [col for col in columns_lower if col.endswith(' id') or col.endswith('id')]
+        value_count = 0
+        id_count = 0
+        for col_lower in columns_lower:
+            if _VALUE_COLUMN_RE.search(col_lower):
+                value_count += 1
+            if col_lower.endswith('id'):
+                id_count += 1
         
         # Fact table scoring
         fact_score = 0
-        if any(indicator in name_lower for indicator in fact_indicators):
+        if _FACT_NAME_RE.search(name_lower):
             fact_score += 0.4
-        if value_columns:
-            fact_score += 0.3 + (len(value_columns) * 0.1)
-        if len(id_columns) >= 3:  # Many relationships = likely fact table
+        if value_count:
+            fact_score += 0.3 + (value_count * 0.1)
+        if id_count >= 3:  # Many relationships = likely fact table
             fact_score += 0.2
         
         # Dimension table penalties
-        if any(indicator in name_lower for indicator in dimension_indicators):
+        if _DIMENSION_NAME_RE.search(name_lower):
             fact_score -= 0.3
-        if len(columns) < 5:  # Small tables likely dimensions
+        if len(columns_lower) < 5:  # Small tables likely dimensions
             fact_score -= 0.1
         
         is_fact = fact_score > 0.5
@@ -129,11 +209,20 @@ class ModelSchemaManager:
                             dataset_name: str = None,
                             force_refresh: bool = False) -> Dict[str, TableSchema]:
         """Discover table and column schema from Power BI model"""
-        workspace_name = workspace_name or settings.default_workspace_name
-        dataset_name = dataset_name or settings.default_dataset_name
+        default_workspace, default_dataset = self._resolve_defaults()
+        workspace_name = workspace_name or default_workspace
+        dataset_name = dataset_name or default_dataset
         
-        # Cache disabled - always get fresh schema
-        # Always refresh to ensure latest model structure from Power BI
+        # Serve the cached schema for the same model unless a refresh is forced
+        if not force_refresh and self._cached_tables and self._cached_model == (workspace_name, dataset_name):
+            if datetime.now() - self._last_discovery < timedelta(hours=self.cache_expiry_hours):
+                mcp_logger.debug("Model schema served from cache")
+                return self._cached_tables
+            
+            # Stale-while-revalidate: answer from the stale cache, refresh in the background
+            mcp_logger.info("Model schema cache stale - refreshing in background")
+            self._start_background_refresh(workspace_name, dataset_name)
+            return self._cached_tables
         
         try:
             mcp_logger.info(f"Discovering model schema from {workspace_name}/{dataset_name}")
@@ -146,8 +235,8 @@ class ModelSchemaManager:
             discovered_tables = {}
             
             try:
-                # Use the 4 DAX queries to understand model structure
-                mcp_logger.info("Using new discovery method with 4 DAX queries")
+                # Use the tables and columns DAX queries to understand model structure
+                mcp_logger.info("Using DAX discovery method with 2 parallel queries")
                 
                 # Query 1: Get Tables with descriptions
                 tables_query = """
@@ -165,109 +254,85 @@ class ModelSchemaManager:
                 )
                 """
                 
-                # Execute tables query
-                tables_result = client.execute_dax_query(
-                    workspace['id'], dataset['id'], tables_query
-                )
+                # Execute tables and columns queries in parallel - both are
+                # independent network-bound requests
+                with ThreadPoolExecutor(max_workers=2) as executor:
+                    tables_future = executor.submit(
+                        client.execute_dax_query, workspace['id'], dataset['id'], tables_query
+                    )
+                    columns_future = executor.submit(
+                        client.execute_dax_query, workspace['id'], dataset['id'], columns_query
+                    )
                 
-                # Execute columns query
-                columns_result = client.execute_dax_query(
-                    workspace['id'], dataset['id'], columns_query
-                )
+                # A failure in one query still yields a partial schema from the other
+                try:
+                    tables_result = tables_future.result()
+                except Exception as e:
+                    mcp_logger.warning(f"Tables discovery query failed: {e}")
+                    tables_result = {}
                 
-                # Parse tables - Handle both result formats
-                table_info = {}
-                mcp_logger.info(f"Tables result format: {type(tables_result)}")
-                mcp_logger.info(f"Tables result sample: {str(tables_result)[:500]}...")
+                try:
+                    columns_result = columns_future.result()
+                except Exception as e:
+                    mcp_logger.warning(f"Columns discovery query failed: {e}")
+                    columns_result = {}
                 
-                # Try custom DAX result format first (list with rows)
-                if isinstance(tables_result, list) and len(tables_result) > 0:
-                    first_result = tables_result[0]
-                    if 'rows' in first_result:
-                        rows = first_result['rows']
-                        mcp_logger.info(f"Found {len(rows)} tables using custom DAX format")
-                        for row in rows:
-                            table_name = row.get('__def_Tables[Name]', '')
-                            description = row.get('__def_Tables[Description]', '')
-                            if table_name:
-                                table_info[table_name] = description
+                if not tables_result and not columns_result:
+                    raise DAXQueryError("Both table and column discovery queries failed")
                 
-                # Fallback to original result format
-                elif 'results' in tables_result:
-                    tables = tables_result['results'][0].get('tables', [])
-                    if tables and 'rows' in tables[0]:
-                        rows = tables[0]['rows']
-                        mcp_logger.info(f"Found {len(rows)} tables using original format")
-                        for row in rows:
-                            table_name = row.get('__def_Tables[Name]', '')
-                            description = row.get('__def_Tables[Description]', '')
-                            if table_name:
-                                table_info[table_name] = description
+                debug_enabled = mcp_logger.is_enabled_for(logging.DEBUG)
+                if debug_enabled:
+                    mcp_logger.debug(f"Tables result format: {type(tables_result)}")
+                    mcp_logger.debug(f"Tables result sample: {str(tables_result)[:500]}...")
+                    mcp_logger.debug(f"Columns result format: {type(columns_result)}")
+                    mcp_logger.debug(f"Columns result sample: {str(columns_result)[:500]}...")
                 
-                # Parse columns and group by table - Handle both result formats  
-                table_columns = {}
-                mcp_logger.info(f"Columns result format: {type(columns_result)}")
-                mcp_logger.info(f"Columns result sample: {str(columns_result)[:500]}...")
+                # Parse tables
+                table_info = {}
+                table_rows = _get_dax_rows(tables_result)
+                for row in table_rows:
+                    try:
+                        table_name, description = _table_row_fields(row)
+                    except KeyError:
+                        continue
+                    if table_name:
+                        table_info[table_name] = description
                 
-                # Try custom DAX result format first
-                if isinstance(columns_result, list) and len(columns_result) > 0:
-                    first_result = columns_result[0]
-                    if 'rows' in first_result:
-                        rows = first_result['rows']
-                        mcp_logger.info(f"Found {len(rows)} columns using custom DAX format")
-                        for row in rows:
-                            table_name = row.get('__def_Columns[Table]', '')
-                            column_name = row.get('__def_Columns[Name]', '')
-                            column_desc = row.get('__def_Columns[Description]', '')
-                            
-                            if table_name and column_name:
-                                if table_name not in table_columns:
-                                    table_columns[table_name] = []
-                                table_columns[table_name].append(column_name)
+                # Parse columns and group by table
+                table_columns = defaultdict(list)
+                column_rows = _get_dax_rows(columns_result)
+                for row in column_rows:
+                    try:
+                        table_name, column_name = _column_row_fields(row)
+                    except KeyError:
+                        continue
+                    if table_name and column_name:
+                        table_columns[table_name].append(column_name)
                 
-                # Fallback to original result format
-                elif 'results' in columns_result:
-                    tables = columns_result['results'][0].get('tables', [])
-                    if tables and 'rows' in tables[0]:
-                        rows = tables[0]['rows']
-                        mcp_logger.info(f"Found {len(rows)} columns using original format")
-                        for row in rows:
-                            table_name = row.get('__def_Columns[Table]', '')
-                            column_name = row.get('__def_Columns[Name]', '')
-                            column_desc = row.get('__def_Columns[Description]', '')
-                            
-                            if table_name and column_name:
-                                if table_name not in table_columns:
-                                    table_columns[table_name] = []
-                                table_columns[table_name].append(column_name)
+                mcp_logger.info(f"Found {len(table_rows)} tables and {len(column_rows)} columns")
                 
-                # Create TableSchema objects
-                for table_name in table_info.keys():
+                # Create TableSchema objects in one pass over described tables followed by
+                # tables that only have columns, lowercasing each column name once
+                for table_name in {**dict.fromkeys(table_info), **dict.fromkeys(table_columns)}:
                     columns = table_columns.get(table_name, [])
+                    columns_lower = tuple(col.lower() for col in columns)
                     
                     # Categorize table as fact or dimension
-                    is_fact, confidence = self._categorize_table(table_name, columns)
+                    is_fact, confidence = self._categorize_table(table_name, columns_lower)
+                    if table_name not in table_info:
+                        confidence *= 0.8  # Lower confidence for no description
                     
                     discovered_tables[table_name] = TableSchema(
                         name=table_name,
                         columns=columns,
                         is_fact_table=is_fact,
-                        confidence=confidence
+                        confidence=confidence,
+                        columns_lower=columns_lower
                     )
                 
-                # Also add tables that have columns but no description (fallback)
-                for table_name, columns in table_columns.items():
-                    if table_name not in discovered_tables:
-                        is_fact, confidence = self._categorize_table(table_name, columns)
-                        discovered_tables[table_name] = TableSchema(
-                            name=table_name,
-                            columns=columns,
-                            is_fact_table=is_fact,
-                            confidence=confidence * 0.8  # Lower confidence for no description
-                        )
-                
                 self._cached_tables = discovered_tables
                 self._last_discovery = datetime.now()
+                self._cached_model = (workspace_name, dataset_name)
                 self._save_cache()
                 
                 mcp_logger.info(f"Discovered {len(discovered_tables)} table schemas using new DAX queries")
@@ -281,12 +346,59 @@ class ModelSchemaManager:
             mcp_logger.error(f"Failed to discover schema: {e}")
             return {}
     
+    def _resolve_defaults(self) -> Tuple[Optional[str], Optional[str]]:
+        """Get the default (workspace, dataset), captured from settings on first use"""
+        if self._default_model is None:
+            self._default_model = (settings.default_workspace_name, settings.default_dataset_name)
+        return self._default_model
+    
+    def reload_defaults(self) -> None:
+        """Re-read the default workspace and dataset from settings on next discovery"""
+        settings.reload()
+        self._default_model = None
+    
+    def _start_background_refresh(self, workspace_name: str, dataset_name: str) -> None:
+        """Refresh the schema cache on a daemon thread (at most one refresh at a time)"""
+        with self._refresh_lock:
+            if self._refresh_in_progress:
+                return
+            self._refresh_in_progress = True
+        
+        def refresh():
+            try:
+                self.discover_model_schema(workspace_name, dataset_name, force_refresh=True)
+            finally:
+                self._refresh_in_progress = False
+        
+        threading.Thread(target=refresh, daemon=True).start()
+    
+    @staticmethod
+    def _index_tables(tables: Dict[str, TableSchema]) -> _SchemaSnapshot:
+        """Build the tables together with their case-insensitive table and column lookup indexes"""
+        table_index: Dict[str, str] = {}
+        column_index: Dict[str, List[str]] = {}
+        
+        for table_name, table in tables.items():
+            # First table wins when names differ only by case
+            table_index.setdefault(table.name_lower, table_name)
+            for column_lower in set(table.columns_lower):
+                column_index.setdefault(column_lower, []).append(table_name)
+        
+        return tables, table_index, column_index
+    
     def get_table_by_name(self, table_name: str) -> Optional[TableSchema]:
         """Get table schema by name (case insensitive)"""
-        for name, table in self._cached_tables.items():
-            if name.lower() == table_name.lower():
-                return table
-        return None
+        self._ensure_loaded()
+        tables, table_index, _ = self._schema
+        original_name = table_index.get(table_name.lower())
+        return tables.get(original_name) if original_name else None
+    
+    def get_source_fingerprint(self) -> Optional[str]:
+        """Fingerprint of the cached schema, or None if no schema has been discovered"""
+        self._ensure_loaded()
+        if self._last_discovery is None:
+            return None
+        return f"{self._cached_model}:{len(self._schema[0])}:{self._last_discovery.isoformat()}"
     
     def get_fact_tables(self) -> List[TableSchema]:
         """Get tables identified as fact tables"""
@@ -298,39 +410,29 @@ class ModelSchemaManager:
     
     def find_column_in_tables(self, column_name: str) -> List[str]:
         """Find which tables contain a specific column"""
-        matching_tables = []
-        for table_name, table in self._cached_tables.items():
-            if any(col.lower() == column_name.lower() for col in table.columns):
-                matching_tables.append(table_name)
-        return matching_tables
+        self._ensure_loaded()
+        # Copy so callers cannot mutate the shared index
+        return list(self._schema[2].get(column_name.lower(), ()))
     
     def get_corrected_table_name(self, assumed_name: str) -> Optional[str]:
         """Get correct table name for commonly assumed names"""
+        self._ensure_loaded()
+        tables, table_index, _ = self._schema
         assumed_lower = assumed_name.lower()
         
         # Common corrections
-        corrections = {
-            'date': '_Date',
-            'period': '_Period', 
-            'scenario': '_Scenario',
-            'accounts': 'Accounts',
-            'journals': 'Journals',
-            'mapping': 'Mapping'
-        }
-        
-        if assumed_lower in corrections:
-            corrected = corrections[assumed_lower]
-            if corrected in self._cached_tables:
-                return corrected
+        corrected = _TABLE_CORRECTIONS.get(assumed_lower)
+        if corrected and corrected in tables:
+            return corrected
         
         # Try exact match first
-        for table_name in self._cached_tables:
-            if table_name.lower() == assumed_lower:
-                return table_name
+        exact_match = table_index.get(assumed_lower)
+        if exact_match:
+            return exact_match
         
-        # Try partial match
-        for table_name in self._cached_tables:
-            if assumed_lower in table_name.lower() or table_name.lower() in assumed_lower:
+        # Try partial match (index keys are already lowercased)
+        for table_lower, table_name in table_index.items():
+            if assumed_lower in table_lower or table_lower in assumed_lower:
                 return table_name
         
         return None
@@ -342,14 +444,19 @@ class ModelSchemaManager:
             return []
         
         fragment_lower = column_fragment.lower()
-        suggestions = []
-        
-        for column in table.columns:
-            if fragment_lower in column.lower():
-                suggestions.append(column)
-        
-        return suggestions
+        return [
+            column for column, column_lower in zip(table.columns, table.columns_lower)
+            if fragment_lower in column_lower
+        ]
+
+
+# Global instance, created on first use
+_schema_manager: Optional[ModelSchemaManager] = None
 
 
-# Global instance
-model_schema_manager = ModelSchemaManager()
\ No newline at end of file
+def get_schema_manager() -> ModelSchemaManager:
+    """Get or create the global model schema manager"""
+    global _schema_manager
+    if _schema_manager is None:
+        _schema_manager = ModelSchemaManager()
+    return _schema_manager
\ No newline at end of file
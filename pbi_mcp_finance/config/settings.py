@@ -3,6 +3,7 @@ Configuration management for Power BI MCP Finance Server
 """
 
 import os
+from functools import cached_property
 from pathlib import Path
 from typing import Optional
 
@@ -13,48 +14,50 @@ class Settings:
     def __init__(self):
         self.script_dir = Path(__file__).parent.parent.parent.absolute()
         self.shared_dir = self.script_dir / "shared"
-        self.shared_dir.mkdir(exist_ok=True)
-    
-    # Database Paths
-    @property
-    def conversation_db_path(self) -> Path:
-        return self.shared_dir / "conversation_db.sqlite"
-    
-    @property
-    def metrics_db_path(self) -> Path:
-        return self.shared_dir / "mcp_metrics.sqlite"
-    
-    @property
-    def optimization_db_path(self) -> Path:
-        return self.shared_dir / "optimization_history.sqlite"
+        if not self.shared_dir.exists():
+            self.shared_dir.mkdir(exist_ok=True)
+        
+        # Database Paths - fixed for the process lifetime, so resolved once
+        self.conversation_db_path: Path = self.shared_dir / "conversation_db.sqlite"
+        self.metrics_db_path: Path = self.shared_dir / "mcp_metrics.sqlite"
+        self.optimization_db_path: Path = self.shared_dir / "optimization_history.sqlite"
+        
+        # Token Storage Configuration
+        self.token_file_path: Path = self.shared_dir / "powerbi_token.json"
+    
+    def reload(self) -> None:
+        """Drop memoized environment values so they are re-read on next access"""
+        for name, attr in vars(type(self)).items():
+            if isinstance(attr, cached_property):
+                self.__dict__.pop(name, None)
     
     # Authentication Configuration
-    @property
+    @cached_property
     def powerbi_client_id(self) -> Optional[str]:
         return os.environ.get("POWERBI_CLIENT_ID")
     
-    @property
+    @cached_property
     def powerbi_client_secret(self) -> Optional[str]:
         return os.environ.get("POWERBI_CLIENT_SECRET")
     
-    @property
+    @cached_property
     def powerbi_tenant_id(self) -> Optional[str]:
         return os.environ.get("POWERBI_TENANT_ID")
     
-    @property
+    @cached_property
     def powerbi_manual_token(self) -> Optional[str]:
         return os.environ.get("POWERBI_TOKEN")
     
     # Power BI Configuration - No hardcoded defaults
-    @property
+    @cached_property
     def default_workspace_name(self) -> Optional[str]:
         return os.environ.get("POWERBI_WORKSPACE")
     
-    @property
+    @cached_property
     def default_workspace_id(self) -> Optional[str]:
         return os.environ.get("POWERBI_WORKSPACE_ID")
     
-    @property
+    @cached_property
     def default_dataset_name(self) -> Optional[str]:
         return os.environ.get("POWERBI_DATASET")
     
@@ -62,35 +65,46 @@ class Settings:
         """Check if default workspace configuration is available"""
         return bool(self.default_workspace_name and self.default_dataset_name)
     
+    @cached_property
+    def quick_reference_full(self) -> bool:
+        """Embed measure mappings and table corrections in powerbi://quick-reference (QUICK_REFERENCE_FULL=1)"""
+        return os.environ.get("QUICK_REFERENCE_FULL", "0").lower() in ("1", "true", "yes")
+    
     # API Configuration
-    @property
+    @cached_property
     def powerbi_api_base_url(self) -> str:
         return "https://api.powerbi.com/v1.0/myorg"
     
-    @property
+    @cached_property
     def fabric_api_base_url(self) -> str:
         return "https://api.fabric.microsoft.com/v1"
     
     # Monitoring Configuration
-    @property
+    @cached_property
     def dashboard_port(self) -> int:
         return int(os.environ.get("DASHBOARD_PORT", "5555"))
     
-    @property
+    @cached_property
     def dashboard_refresh_interval(self) -> int:
         return int(os.environ.get("DASHBOARD_REFRESH_MS", "5000"))
     
-    # Token Storage Configuration
-    @property
-    def token_file_path(self) -> Path:
-        return self.shared_dir / "powerbi_token.json"
+    # Database Configuration
+    @cached_property
+    def sqlite_tuning_enabled(self) -> bool:
+        """Apply WAL/cache/mmap PRAGMAs to new SQLite connections (SQLITE_TUNING=0 disables)"""
+        return os.environ.get("SQLITE_TUNING", "1").lower() not in ("0", "false", "no")
+    
+    @cached_property
+    def sqlite_max_readers(self) -> int:
+        """Read-only connections pooled per SQLite database"""
+        return max(1, int(os.environ.get("SQLITE_MAX_READERS", "4")))
     
     # OAuth2 Configuration
-    @property
+    @cached_property
     def oauth_scope(self) -> str:
         return "https://analysis.windows.net/powerbi/api/.default"
     
-    @property
+    @cached_property
     def oauth_token_url(self) -> str:
         tenant_id = self.powerbi_tenant_id or "common"
         return f"https://login.microsoftonline.com/{tenant_id}/oauth2/v2.0/token"
@@ -3,18 +3,281 @@ Context builder for Power BI model information
 Creates comprehensive context data for automatic injection into Claude conversations
 """
 
-import json
+import atexit
 import hashlib
-from datetime import datetime, timedelta
-from typing import Dict, Any, List, Optional, Tuple
+import queue
+import threading
+import time
+import zlib
+from collections import Counter
+from datetime import datetime
+from itertools import groupby
+from operator import itemgetter
+from typing import Dict, Any, List, NamedTuple, Optional, Tuple
 
 from ..config.settings import settings
 from ..config.dynamic_measures import dynamic_measure_manager
-from ..config.model_schema import model_schema_manager
+from ..config.model_schema import get_schema_manager
 from ..config.constants import FINANCIAL_MEASURES, POHODA_TABLES
 from ..utils.logging import mcp_logger
+from ..utils.serialization import json_dumps_bytes, json_loads
 from ..database.connection import db_manager
 
+try:
+    import zstandard
+except ImportError:  # zstandard is optional - zlib is used instead
+    zstandard = None
+
+
+# context_data is stored compressed with zstd when available, otherwise zlib; rows
+# written before compression have NULL in the compression column
+_CONTEXT_COMPRESSION = 'zstd' if zstandard is not None else 'zlib'
+_ZSTD_LEVEL = 3
+_READABLE_COMPRESSIONS = (None, 'zlib', 'zstd') if zstandard is not None else (None, 'zlib')
+
+# zstd (de)compressor objects are not thread-safe, so each thread keeps its own
+_zstd_local = threading.local()
+
+# Cache and performance timestamps are stored as integer nanoseconds since the epoch
+_NS_PER_HOUR = 3600 * 1_000_000_000
+_NS_PER_DAY = 24 * _NS_PER_HOUR
+
+# Cache hits are counted in memory and written out at most this often
+_HIT_FLUSH_SECONDS = 5
+
+# Hot-path statements, kept as constants so sqlite3's per-connection statement cache reuses them
+# An upsert rather than INSERT OR REPLACE: REPLACE's implicit delete would skip the
+# context_cache_stats delete trigger
+_CACHE_INSERT_SQL = """
+INSERT INTO context_cache 
+(id, context_type, workspace, dataset, content_hash, context_data, 
+ created_at, expires_at, hit_count, last_accessed, source_fingerprint, compression)
+VALUES (?, ?, ?, ?, ?, ?, ?, ?, 0, ?, ?, ?)
+ON CONFLICT(id) DO UPDATE SET 
+    content_hash = excluded.content_hash, context_data = excluded.context_data, 
+    created_at = excluded.created_at, expires_at = excluded.expires_at, hit_count = 0, 
+    last_accessed = excluded.last_accessed, source_fingerprint = excluded.source_fingerprint, 
+    compression = excluded.compression
+"""
+
+_CACHE_TOUCH_SQL = """
+UPDATE context_cache 
+SET expires_at = ?, last_accessed = ?, source_fingerprint = ? 
+WHERE id = ?
+"""
+
+_CACHE_HIT_SQL = """
+UPDATE context_cache 
+SET hit_count = hit_count + ?, last_accessed = ? 
+WHERE id = ?
+"""
+
+_PERFORMANCE_INSERT_SQL = """
+INSERT INTO context_performance 
+(context_type, operation, execution_time_ms, cache_hit, timestamp, workspace, dataset)
+VALUES (?, ?, ?, ?, ?, ?, ?)
+"""
+
+_CACHE_HASH_SQL = "SELECT content_hash, compression FROM context_cache WHERE id = ?"
+
+_CACHE_DELETE_BY_ID_SQL = "DELETE FROM context_cache WHERE id = ?"
+
+# The merged 'complete' row embeds every sub-context, so clearing one type clears it too
+_CACHE_DELETE_BY_TYPE_SQL = """
+DELETE FROM context_cache 
+WHERE context_type IN (?, 'complete') AND workspace = ? AND dataset = ?
+"""
+
+_CACHE_DELETE_ALL_SQL = "DELETE FROM context_cache WHERE workspace = ? AND dataset = ?"
+
+# Tables created with ISO text timestamps are set aside and recreated with integers.
+# Cached contexts are rebuilt on demand, but performance history is copied back
+_RETIRE_TEXT_TIMESTAMP_SQL = """
+DROP TABLE IF EXISTS context_cache;
+DROP TABLE IF EXISTS context_cache_stats;
+DROP INDEX IF EXISTS idx_performance_timestamp;
+ALTER TABLE context_performance RENAME TO context_performance_legacy;
+"""
+
+# Carry performance history over, converting ISO text to epoch nanoseconds; rows the
+# NOT NULL columns of the new table would reject are skipped rather than failing the migration
+_COPY_LEGACY_PERFORMANCE_SQL = """
+INSERT INTO context_performance 
+(context_type, operation, execution_time_ms, cache_hit, timestamp, workspace, dataset)
+SELECT context_type, operation, execution_time_ms, cache_hit,
+    CAST(strftime('%s', timestamp, 'utc') AS INTEGER) * 1000000000,
+    workspace, dataset
+FROM context_performance_legacy
+WHERE strftime('%s', timestamp, 'utc') IS NOT NULL
+    AND workspace IS NOT NULL AND dataset IS NOT NULL;
+DROP TABLE context_performance_legacy;
+"""
+
+# Seed the stats counters from entries cached before the stats table existed
+_SEED_CACHE_STATS_SQL = """
+INSERT INTO context_cache_stats (workspace, dataset, context_type, entries, bytes)
+SELECT workspace, dataset, context_type, COUNT(*), COALESCE(SUM(LENGTH(context_data)), 0)
+FROM context_cache
+GROUP BY workspace, dataset, context_type;
+"""
+
+# Per-type cache statistics, shaped into a JSON object by SQLite itself
+_CACHE_STATS_SQL = """
+SELECT json_group_object(context_type, json_object(
+    'entries', cache_entries,
+    'total_hits', total_hits,
+    'avg_hits', avg_hits,
+    'last_access', strftime('%Y-%m-%dT%H:%M:%f', last_access / 1e9, 'unixepoch', 'localtime')
+)) as stats
+FROM (
+    SELECT 
+        context_type,
+        COUNT(*) as cache_entries,
+        SUM(hit_count) as total_hits,
+        ROUND(AVG(hit_count), 2) as avg_hits,
+        MAX(last_accessed) as last_access
+    FROM context_cache 
+    WHERE workspace = ? AND dataset = ?
+    GROUP BY context_type
+)
+"""
+
+_PERFORMANCE_STATS_SQL = """
+SELECT json_group_object(context_type, json_object(
+    'avg_time_ms', avg_time,
+    'min_time_ms', min_time,
+    'max_time_ms', max_time,
+    'cache_hit_rate', cache_hit_rate
+)) as stats
+FROM (
+    SELECT 
+        context_type,
+        ROUND(AVG(execution_time_ms), 1) as avg_time,
+        MIN(execution_time_ms) as min_time,
+        MAX(execution_time_ms) as max_time,
+        ROUND(SUM(CASE WHEN cache_hit THEN 1 ELSE 0 END) * 100.0 / COUNT(*), 1) as cache_hit_rate
+    FROM context_performance 
+    WHERE workspace = ? AND dataset = ? 
+        AND timestamp > ?
+    GROUP BY context_type
+)
+"""
+
+# Totals come from the trigger-maintained stats table - no BLOB reads
+_CACHE_SUMMARY_SQL = """
+SELECT 
+    COALESCE(SUM(entries), 0) as total_entries,
+    (
+        SELECT COUNT(*) FROM context_cache 
+        WHERE workspace = ? AND dataset = ? AND expires_at > ?
+    ) as valid_entries,
+    ROUND(COALESCE(SUM(bytes), 0) / 1024.0, 2) as total_size_kb
+FROM context_cache_stats 
+WHERE workspace = ? AND dataset = ?
+"""
+
+_CACHE_INFO_SQL = """
+SELECT 
+    context_type,
+    created_at,
+    expires_at,
+    hit_count,
+    last_accessed,
+    expires_at > ? as is_valid,
+    LENGTH(context_data) as size_bytes
+FROM context_cache 
+WHERE workspace = ? AND dataset = ?
+ORDER BY context_type, created_at DESC
+LIMIT ?
+"""
+
+def _compress_context(content: bytes) -> bytes:
+    """Compress context JSON with the codec named by _CONTEXT_COMPRESSION"""
+    if zstandard is None:
+        return zlib.compress(content, 1)
+    compressor = getattr(_zstd_local, 'compressor', None)
+    if compressor is None:
+        compressor = _zstd_local.compressor = zstandard.ZstdCompressor(level=_ZSTD_LEVEL)
+    return compressor.compress(content)
+
+
+def _decompress_context(data: bytes, compression: str) -> bytes:
+    """Decompress context JSON stored with the given codec"""
+    if compression == 'zlib':
+        return zlib.decompress(data)
+    decompressor = getattr(_zstd_local, 'decompressor', None)
+    if decompressor is None:
+        decompressor = _zstd_local.decompressor = zstandard.ZstdDecompressor()
+    return decompressor.decompress(data)
+
+
+# Sub-contexts that are also cached together as one denormalized 'complete' row
+_COMPLETE_SECTIONS = ('measures', 'schema', 'financial_hierarchy')
+
+# Financial statement hierarchy context - static, so it is built once at import
+_HIERARCHY_CONTEXT = {
+    'mapping_table_info': {
+        'description': 'CRITICAL for financial analysis - provides EBITDA vs Below EBITDA classification',
+        'key_columns': ['Account Id', 'Account Code', 'Account Name', 'lvl1', 'lvl2', 'lvl3', 'lvl4'],
+        'hierarchy_levels': {
+            'lvl1': 'Top level - EBITDA or Below EBITDA classification',
+            'lvl2': 'Secondary classification - detailed financial categories',
+            'lvl3': 'Tertiary classification - specific line items', 
+            'lvl4': 'Most detailed level - granular account classification'
+        },
+        'usage': 'Essential for P&L analysis, financial statement categorization, and EBITDA calculations'
+    },
+    
+    'financial_analysis_guide': {
+        'revenue_classification': 'Use lvl1=EBITDA accounts for revenue analysis',
+        'cost_analysis': 'Use lvl1=Below EBITDA for cost categorization',
+        'hierarchy_queries': 'Always include relevant lvl1-lvl4 columns for proper categorization'
+    }
+}
+
+# Generic measure names, materialized once for the mapping build
+_MAPPING_KEYS = tuple(FINANCIAL_MEASURES)
+
+# Table names Claude commonly assumes, reported with their actual model names
+_COMMON_TABLE_NAMES = ('date', 'period', 'scenario', 'accounts', 'journals', 'mapping')
+
+# Measure category -> context category group (variance/unknown are resolved by substring)
+_CATEGORY_TO_GROUP = {
+    'revenue': 'revenue',
+    'gross_profit': 'profitability',
+    'ebitda': 'profitability',
+    'net_profit': 'profitability',
+    'cash': 'balance_sheet',
+    'working_capital': 'balance_sheet',
+    'total_assets': 'balance_sheet',
+    'equity': 'balance_sheet'
+}
+
+
+class _PendingCacheWrite(NamedTuple):
+    """context_cache row state queued for the background writer but not yet committed
+    
+    kind is 'insert' (full content, uncompressed), 'touch' (new expiry/fingerprint for
+    the stored row) or 'delete'.
+    """
+    kind: str
+    context_type: str
+    content_hash: Optional[str] = None
+    content: Optional[bytes] = None
+    source_fingerprint: Optional[str] = None
+    expires_ns: int = 0
+
+
+# (sql, params, (context id, pending cache write) or None) as queued for the writer
+_QueuedWrite = Tuple[str, tuple, Optional[Tuple[str, _PendingCacheWrite]]]
+
+
+def _ns_to_iso(timestamp_ns: Optional[int]) -> Optional[str]:
+    """Render an epoch-nanosecond timestamp as a local ISO string for display"""
+    if timestamp_ns is None:
+        return None
+    return datetime.fromtimestamp(timestamp_ns / 1_000_000_000).isoformat()
+
 
 class PowerBIContextBuilder:
     """Builds comprehensive Power BI context for Claude conversations with SQLite caching"""
@@ -23,6 +286,29 @@ class PowerBIContextBuilder:
         self.workspace_name = settings.default_workspace_name
         self.dataset_name = settings.default_dataset_name
         self.context_db_path = settings.shared_dir / 'context_cache.sqlite'
+        
+        # Cache and performance writes are queued and flushed by a background thread
+        self._write_queue: "queue.Queue[_QueuedWrite]" = queue.Queue()
+        self._writer_thread: Optional[threading.Thread] = None
+        self._writer_lock = threading.Lock()
+        
+        # Latest queued-but-uncommitted context_cache write per context id; reads and the
+        # dirty check consult it before the database so a just-cached context is not missed
+        self._pending_cache: Dict[str, _PendingCacheWrite] = {}
+        self._pending_lock = threading.Lock()
+        
+        # Per-id hit counts and last access times not yet written to the cache table
+        self._hit_counts: Counter = Counter()
+        self._hit_last_access: Dict[str, int] = {}
+        self._hit_lock = threading.Lock()
+        self._last_hit_flush_ns = time.time_ns()
+        
+        # Known expiry per context id, so fresh entries are read by primary key alone
+        self._ttl_index: Dict[str, int] = {}
+        
+        # Bumped whenever cached context content changes or is cleared
+        self._content_version = 0
+        
         self._ensure_context_tables()
     
     def build_measures_context(self) -> Dict[str, Any]:
@@ -34,11 +320,11 @@ class PowerBIContextBuilder:
             revenue_measures = dynamic_measure_manager.get_revenue_measures()
             
             # Build measure mappings
-            mappings = {}
-            for generic_name in FINANCIAL_MEASURES.keys():
-                actual_measure = dynamic_measure_manager.get_measure_mapping(generic_name)
-                if actual_measure:
-                    mappings[generic_name] = actual_measure
+            get_measure_mapping = dynamic_measure_manager.get_measure_mapping
+            mappings = {
+                generic_name: actual_measure for generic_name in _MAPPING_KEYS
+                if (actual_measure := get_measure_mapping(generic_name))
+            }
             
             # Categorize measures by type
             categorized_measures = {
@@ -50,22 +336,12 @@ class PowerBIContextBuilder:
             }
             
             for measure in discovered_measures.values():
-                category_group = 'unknown'
-                if measure.category in ['revenue']:
-                    category_group = 'revenue'
-                elif measure.category in ['gross_profit', 'ebitda', 'net_profit']:
-                    category_group = 'profitability'
-                elif measure.category in ['cash', 'working_capital', 'total_assets', 'equity']:
-                    category_group = 'balance_sheet'
-                elif 'py' in measure.category or 'budget' in measure.category:
-                    category_group = 'variance'
+                category = measure.category
+                category_group = _CATEGORY_TO_GROUP.get(category)
+                if category_group is None:
+                    category_group = 'variance' if 'py' in category or 'budget' in category else 'unknown'
                 
-                categorized_measures[category_group].append({
-                    'name': measure.name,
-                    'category': measure.category,
-                    'confidence': measure.confidence,
-                    'aliases': measure.aliases
-                })
+                categorized_measures[category_group].append(measure.summary)
             
             context = {
                 'workspace': self.workspace_name,
@@ -82,12 +358,7 @@ class PowerBIContextBuilder:
                 
                 # High-confidence measures for quick reference
                 'recommended_measures': {
-                    measure.name: {
-                        'category': measure.category,
-                        'confidence': int(measure.confidence * 100),
-                        'suggested_use': f"Use [{measure.name}] for {measure.category} queries"
-                    }
-                    for measure in high_confidence.values()
+                    measure.name: measure.recommended for measure in high_confidence.values()
                 },
                 
                 # Usage instructions
@@ -115,17 +386,13 @@ class PowerBIContextBuilder:
         """Build schema context with table/column corrections"""
         try:
             # Get discovered schema
+            model_schema_manager = get_schema_manager()
             discovered_tables = model_schema_manager._cached_tables
             fact_tables = model_schema_manager.get_fact_tables()
             dim_tables = model_schema_manager.get_dimension_tables()
             
             # Common table name corrections
-            corrections = {}
-            common_names = ['date', 'period', 'scenario', 'accounts', 'journals', 'mapping']
-            for name in common_names:
-                corrected = model_schema_manager.get_corrected_table_name(name)
-                if corrected and corrected.lower() != name:
-                    corrections[name.title()] = corrected
+            corrections = self._get_table_name_corrections(model_schema_manager)
             
             # Key table information
             key_tables = {}
@@ -138,18 +405,20 @@ class PowerBIContextBuilder:
                 }
             
             # Date table
-            date_tables = [t for t in dim_tables if 'date' in t.name.lower()]
-            if date_tables:
-                date_table = date_tables[0]
+            # Tables carry pre-lowered names/columns, so no per-build lowercasing
+            date_table = next((t for t in dim_tables if 'date' in t.name_lower), None)
+            if date_table:
                 key_tables['date_table'] = {
                     'name': date_table.name,
-                    'year_columns': [col for col in date_table.columns if 'year' in col.lower()]
+                    'year_columns': [
+                        col for col, col_lower in zip(date_table.columns, date_table.columns_lower)
+                        if 'year' in col_lower
+                    ]
                 }
             
             # Mapping table
-            mapping_tables = [t for t in discovered_tables.values() if 'mapping' in t.name.lower()]
-            if mapping_tables:
-                mapping_table = mapping_tables[0]
+            mapping_table = next((t for t in discovered_tables.values() if 'mapping' in t.name_lower), None)
+            if mapping_table:
                 key_tables['mapping_table'] = {
                     'name': mapping_table.name,
                     'hierarchy_columns': [col for col in mapping_table.columns if col.startswith('lvl')]
@@ -194,39 +463,21 @@ class PowerBIContextBuilder:
                 'static_info': POHODA_TABLES
             }
     
+    @staticmethod
+    def _get_table_name_corrections(model_schema_manager) -> Dict[str, str]:
+        """Map commonly assumed table names to the actual ones where they differ"""
+        corrections = {}
+        for name in _COMMON_TABLE_NAMES:
+            corrected = model_schema_manager.get_corrected_table_name(name)
+            if corrected and corrected.lower() != name:
+                corrections[name.title()] = corrected
+        return corrections
+    
     def build_financial_hierarchy_context(self) -> Dict[str, Any]:
         """Build context for financial statement hierarchy (Mapping table)"""
-        try:
-            context = {
-                'mapping_table_info': {
-                    'description': 'CRITICAL for financial analysis - provides EBITDA vs Below EBITDA classification',
-                    'key_columns': ['Account Id', 'Account Code', 'Account Name', 'lvl1', 'lvl2', 'lvl3', 'lvl4'],
-                    'hierarchy_levels': {
-                        'lvl1': 'Top level - EBITDA or Below EBITDA classification',
-                        'lvl2': 'Secondary classification - detailed financial categories',
-                        'lvl3': 'Tertiary classification - specific line items', 
-                        'lvl4': 'Most detailed level - granular account classification'
-                    },
-                    'usage': 'Essential for P&L analysis, financial statement categorization, and EBITDA calculations'
-                },
-                
-                'financial_analysis_guide': {
-                    'revenue_classification': 'Use lvl1=EBITDA accounts for revenue analysis',
-                    'cost_analysis': 'Use lvl1=Below EBITDA for cost categorization',
-                    'hierarchy_queries': 'Always include relevant lvl1-lvl4 columns for proper categorization'
-                }
-            }
-            
-            # Cache context for performance
-            self._cache_context('financial_hierarchy', context)
-            return context
-            
-        except Exception as e:
-            mcp_logger.warning(f"Could not build hierarchy context: {e}")
-            return {
-                'error': 'Hierarchy context unavailable', 
-                'static_info': POHODA_TABLES.get('Mapping', {})
-            }
+        # Built from constants only - nothing to compute or cache. Shallow copy since
+        # callers annotate the top level
+        return dict(_HIERARCHY_CONTEXT)
     
     def build_complete_context(self) -> Dict[str, Any]:
         """Build complete Power BI context for Claude"""
@@ -287,15 +538,13 @@ class PowerBIContextBuilder:
     def get_context_summary(self) -> str:
         """Get a human-readable summary of available context"""
         try:
-            context = self.build_complete_context()
-            
-            if 'error' in context:
-                return f"❌ Context Error: {context['error']}"
-            
-            measures_count = context['measures'].get('total_measures', 0)
-            mappings_count = len(context['measures'].get('active_mappings', {}))
-            tables_count = context['schema'].get('total_tables', 0)
-            corrections_count = len(context['schema'].get('table_name_corrections', {}))
+            # Only a few counters are needed - read them straight from the managers
+            # instead of building (and caching) any context
+            model_schema_manager = get_schema_manager()
+            measures_count = len(dynamic_measure_manager.get_all_discovered_measures())
+            mappings_count = dynamic_measure_manager.get_mappings_count()
+            tables_count = len(model_schema_manager._cached_tables)
+            corrections_count = len(self._get_table_name_corrections(model_schema_manager))
             
             summary = f"""
 📊 Power BI Context Ready:
@@ -324,11 +573,13 @@ class PowerBIContextBuilder:
                 workspace TEXT NOT NULL,
                 dataset TEXT NOT NULL,
                 content_hash TEXT NOT NULL,
-                context_data TEXT NOT NULL,
-                created_at TEXT NOT NULL,
-                expires_at TEXT NOT NULL,
+                context_data BLOB NOT NULL,
+                created_at INTEGER NOT NULL,
+                expires_at INTEGER NOT NULL,
                 hit_count INTEGER DEFAULT 0,
-                last_accessed TEXT NOT NULL
+                last_accessed INTEGER NOT NULL,
+                source_fingerprint TEXT,
+                compression TEXT
             );
             
             CREATE TABLE IF NOT EXISTS context_performance (
@@ -337,129 +588,441 @@ class PowerBIContextBuilder:
                 operation TEXT NOT NULL,
                 execution_time_ms INTEGER NOT NULL,
                 cache_hit BOOLEAN NOT NULL,
-                timestamp TEXT NOT NULL,
+                timestamp INTEGER NOT NULL,
                 workspace TEXT NOT NULL,
                 dataset TEXT NOT NULL
             );
             
-            CREATE INDEX IF NOT EXISTS idx_context_cache_type_workspace 
-                ON context_cache(context_type, workspace, dataset);
+            -- Covers the workspace/dataset(/type) filters, deletes and per-type ordering;
+            -- supersedes the old (context_type, workspace, dataset) index
+            DROP INDEX IF EXISTS idx_context_cache_type_workspace;
+            CREATE INDEX IF NOT EXISTS idx_context_cache_workspace_dataset 
+                ON context_cache(workspace, dataset, context_type, expires_at);
             CREATE INDEX IF NOT EXISTS idx_context_cache_expires 
                 ON context_cache(expires_at);
             CREATE INDEX IF NOT EXISTS idx_performance_timestamp 
                 ON context_performance(timestamp);
+            
+            -- Entry counts and sizes per workspace/dataset/type, kept current by triggers
+            CREATE TABLE IF NOT EXISTS context_cache_stats (
+                workspace TEXT NOT NULL,
+                dataset TEXT NOT NULL,
+                context_type TEXT NOT NULL,
+                entries INTEGER NOT NULL DEFAULT 0,
+                bytes INTEGER NOT NULL DEFAULT 0,
+                PRIMARY KEY (workspace, dataset, context_type)
+            );
+            
+            CREATE TRIGGER IF NOT EXISTS trg_context_cache_stats_insert 
+            AFTER INSERT ON context_cache
+            BEGIN
+                INSERT INTO context_cache_stats (workspace, dataset, context_type, entries, bytes)
+                VALUES (NEW.workspace, NEW.dataset, NEW.context_type, 1, LENGTH(NEW.context_data))
+                ON CONFLICT(workspace, dataset, context_type) DO UPDATE SET 
+                    entries = entries + 1, bytes = bytes + excluded.bytes;
+            END;
+            
+            CREATE TRIGGER IF NOT EXISTS trg_context_cache_stats_update 
+            AFTER UPDATE OF context_data ON context_cache
+            BEGIN
+                UPDATE context_cache_stats 
+                SET bytes = bytes - LENGTH(OLD.context_data) + LENGTH(NEW.context_data)
+                WHERE workspace = NEW.workspace AND dataset = NEW.dataset AND context_type = NEW.context_type;
+            END;
+            
+            CREATE TRIGGER IF NOT EXISTS trg_context_cache_stats_delete 
+            AFTER DELETE ON context_cache
+            BEGIN
+                UPDATE context_cache_stats 
+                SET entries = entries - 1, bytes = bytes - LENGTH(OLD.context_data)
+                WHERE workspace = OLD.workspace AND dataset = OLD.dataset AND context_type = OLD.context_type;
+            END;
             """
             
-            db_manager.execute_script(self.context_db_path, create_tables_sql)
+            text_timestamps = self._has_text_timestamps()
+            # A legacy table left behind by an interrupted earlier migration still needs copying
+            legacy_performance = text_timestamps or db_manager.table_exists(
+                self.context_db_path, 'context_performance_legacy'
+            )
+            new_stats_table = text_timestamps or not db_manager.table_exists(
+                self.context_db_path, 'context_cache_stats'
+            )
+            
+            # Migration, creation, seeding and copy-back commit together or not at all
+            script = ["BEGIN IMMEDIATE;"]
+            if text_timestamps:
+                script.append(_RETIRE_TEXT_TIMESTAMP_SQL)
+            script.append(create_tables_sql)
+            if new_stats_table:
+                script.append(_SEED_CACHE_STATS_SQL)
+            if legacy_performance:
+                script.append(_COPY_LEGACY_PERFORMANCE_SQL)
+            script.append("COMMIT;")
+            db_manager.execute_script(self.context_db_path, "\n".join(script))
+            if text_timestamps:
+                mcp_logger.info("Migrated context cache tables to integer timestamps")
+            
+            # Refresh planner statistics so the small cache table uses its indexes
+            db_manager.execute_command(self.context_db_path, "ANALYZE context_cache")
+            
+            # Older cache databases predate source fingerprints and compression
+            columns = {column.name for column in db_manager.get_table_info(self.context_db_path, 'context_cache')}
+            for column_name in ('source_fingerprint', 'compression'):
+                if column_name not in columns:
+                    db_manager.execute_command(
+                        self.context_db_path,
+                        f"ALTER TABLE context_cache ADD COLUMN {column_name} TEXT"
+                    )
             mcp_logger.debug("Context cache tables ensured")
             
         except Exception as e:
             mcp_logger.warning(f"Failed to create context cache tables: {e}")
     
+    def _has_text_timestamps(self) -> bool:
+        """Check whether the cache tables were created with ISO text timestamps"""
+        cache_columns = {
+            column.name: column.type
+            for column in db_manager.get_table_info(self.context_db_path, 'context_cache')
+        }
+        return cache_columns.get('expires_at', 'INTEGER').upper() == 'TEXT'
+    
     def _get_context_id(self, context_type: str) -> str:
         """Generate unique context ID"""
         return f"{context_type}_{self.workspace_name}_{self.dataset_name}"
     
-    def _get_content_hash(self, data: Dict[str, Any]) -> str:
-        """Generate hash of context content for change detection"""
-        content_str = json.dumps(data, sort_keys=True, default=str)
-        return hashlib.md5(content_str.encode()).hexdigest()
+    def _source_fingerprint(self, context_type: str) -> Optional[str]:
+        """Cheap fingerprint of the data a context is built from (None when unknown)"""
+        try:
+            if context_type == 'measures':
+                return dynamic_measure_manager.get_source_fingerprint()
+            if context_type == 'schema':
+                return get_schema_manager().get_source_fingerprint()
+            if context_type == 'financial_hierarchy':
+                return 'static'  # Built from constants only
+            if context_type == 'complete':
+                fingerprints = [self._source_fingerprint(section) for section in _COMPLETE_SECTIONS]
+                if None not in fingerprints:
+                    return '|'.join(fingerprints)
+        except Exception as e:
+            mcp_logger.debug(f"Could not fingerprint {context_type} sources: {e}")
+        return None
+    
+    def get_context_version(self, context_types: Tuple[str, ...]) -> Optional[Tuple[Any, ...]]:
+        """Token that changes whenever the given contexts' sources or cached content change
+        
+        None when any source cannot be fingerprinted, i.e. results must not be memoized.
+        """
+        fingerprints = tuple(self._source_fingerprint(context_type) for context_type in context_types)
+        if None in fingerprints:
+            return None
+        return (self._content_version, *fingerprints)
+    
+    @staticmethod
+    def _decode_context_data(row) -> bytes:
+        """Get the stored context JSON bytes, decompressing if needed"""
+        data = row['context_data']
+        if row['compression'] is not None:
+            return _decompress_context(data, row['compression'])
+        # Uncompressed rows from before compression was added are TEXT
+        return data.encode('utf-8') if isinstance(data, str) else data
+    
+    def _get_content_hash(self, content: bytes) -> str:
+        """Generate hash of serialized context content for change detection"""
+        return hashlib.blake2b(content, digest_size=16).hexdigest()
     
     def _cache_context(self, context_type: str, context_data: Dict[str, Any], ttl_hours: int = 24):
         """Cache context data with TTL"""
         try:
             context_id = self._get_context_id(context_type)
-            content_hash = self._get_content_hash(context_data)
-            now = datetime.now()
-            expires_at = now + timedelta(hours=ttl_hours)
-            
-            insert_sql = """
-            INSERT OR REPLACE INTO context_cache 
-            (id, context_type, workspace, dataset, content_hash, context_data, 
-             created_at, expires_at, hit_count, last_accessed)
-            VALUES (?, ?, ?, ?, ?, ?, ?, ?, 0, ?)
-            """
+            # Hash everything except the build timestamp, so a rebuild with identical
+            # content is recognized as unchanged
+            stable_data = {key: value for key, value in context_data.items() if key != 'last_updated'}
+            content_hash = self._get_content_hash(json_dumps_bytes(stable_data, sort_keys=True))
+            now_ns = time.time_ns()
+            expires_ns = now_ns + ttl_hours * _NS_PER_HOUR
+            source_fingerprint = self._source_fingerprint(context_type)
             
-            db_manager.execute_command(
-                self.context_db_path, 
-                insert_sql,
+            # A write still queued for this id is newer than the stored row
+            with self._pending_lock:
+                pending = self._pending_cache.get(context_id)
+            if pending is not None and pending.kind != 'touch':
+                stored_hash = pending.content_hash
+            else:
+                stored = db_manager.execute_query(
+                    self.context_db_path,
+                    _CACHE_HASH_SQL,
+                    (context_id,)
+                )
+                stored_hash = (stored[0]['content_hash'] if stored
+                               and stored[0]['compression'] in _READABLE_COMPRESSIONS else None)
+            
+            # Unchanged content: extend the existing row instead of rewriting context_data
+            if stored_hash == content_hash:
+                if pending is not None and pending.kind == 'insert':
+                    write = pending._replace(source_fingerprint=source_fingerprint, expires_ns=expires_ns)
+                else:
+                    write = _PendingCacheWrite('touch', context_type, content_hash,
+                                               source_fingerprint=source_fingerprint, expires_ns=expires_ns)
+                self._queue_cache_write(
+                    context_id, write, _CACHE_TOUCH_SQL,
+                    (expires_ns, now_ns, source_fingerprint, context_id)
+                )
+                self._ttl_index[context_id] = expires_ns
+                return
+            
+            content = json_dumps_bytes(context_data, sort_keys=True)
+            self._queue_cache_write(
+                context_id,
+                _PendingCacheWrite('insert', context_type, content_hash, content, source_fingerprint, expires_ns),
+                _CACHE_INSERT_SQL,
                 (context_id, context_type, self.workspace_name, self.dataset_name,
-                 content_hash, json.dumps(context_data), now.isoformat(), 
-                 expires_at.isoformat(), now.isoformat())
+                 content_hash, _compress_context(content), now_ns, 
+                 expires_ns, now_ns,
+                 source_fingerprint, _CONTEXT_COMPRESSION)
             )
+            self._ttl_index[context_id] = expires_ns
+            self._content_version += 1
+            if context_type in _COMPLETE_SECTIONS:
+                # The merged row embeds this sub-context, so it is stale now
+                complete_id = self._get_context_id('complete')
+                self._queue_cache_write(
+                    complete_id, _PendingCacheWrite('delete', 'complete'),
+                    _CACHE_DELETE_BY_ID_SQL, (complete_id,)
+                )
             
         except Exception as e:
             mcp_logger.warning(f"Failed to cache {context_type} context: {e}")
     
-    def _get_cached_context(self, context_type: str) -> Optional[Dict[str, Any]]:
+    def _get_cached_context(self, context_type: str,
+                            require_same_sources: bool = False) -> Optional[Dict[str, Any]]:
         """Retrieve cached context if valid"""
+        return self._get_cached_contexts_bulk(
+            [context_type], require_same_sources=require_same_sources
+        ).get(context_type)
+    
+    def _get_cached_contexts_bulk(self, context_types: List[str],
+                                  require_same_sources: bool = False,
+                                  raw: bool = False) -> Dict[str, Any]:
+        """Retrieve all valid cached contexts of the given types in one query
+        
+        With require_same_sources, only entries whose source fingerprint matches the
+        current sources are returned - used by force_refresh to skip needless rebuilds.
+        With raw, the stored JSON is returned as bytes without being parsed.
+        """
         try:
-            context_id = self._get_context_id(context_type)
-            now = datetime.now().isoformat()
+            now_ns = time.time_ns()
+            context_ids = [self._get_context_id(context_type) for context_type in context_types]
             
-            select_sql = """
-            SELECT context_data, content_hash, created_at 
-            FROM context_cache 
-            WHERE id = ? AND expires_at > ?
-            """
-            
-            results = db_manager.execute_query(
-                self.context_db_path, 
-                select_sql, 
-                (context_id, now)
-            )
+            # Writes still queued for the background writer take precedence over the database
+            with self._pending_lock:
+                pending = {
+                    context_id: self._pending_cache[context_id]
+                    for context_id in context_ids if context_id in self._pending_cache
+                }
+            touches = {context_id: write for context_id, write in pending.items() if write.kind == 'touch'}
+            results = [
+                {'id': context_id, 'context_type': write.context_type, 'context_data': write.content,
+                 'source_fingerprint': write.source_fingerprint, 'compression': None,
+                 'expires_at': write.expires_ns}
+                for context_id, write in pending.items()
+                if write.kind == 'insert' and write.expires_ns > now_ns
+            ]
+            db_ids = [
+                context_id for context_id in context_ids
+                if context_id not in pending or context_id in touches
+            ]
             
-            if results:
-                # Update hit count and last accessed
-                update_sql = """
-                UPDATE context_cache 
-                SET hit_count = hit_count + 1, last_accessed = ? 
-                WHERE id = ?
+            if db_ids:
+                placeholders = ', '.join('?' * len(db_ids))
+                
+                # Entries known to be fresh skip the expiry check; anything else (unknown
+                # or possibly expired here, e.g. written by another process) asks the database.
+                # Rows with a queued touch are checked against their new expiry below instead
+                if touches or all(self._ttl_index.get(context_id, 0) > now_ns for context_id in db_ids):
+                    expiry_filter, params = "", tuple(db_ids)
+                else:
+                    expiry_filter, params = " AND expires_at > ?", (*db_ids, now_ns)
+                
+                select_sql = f"""
+                SELECT id, context_type, context_data, source_fingerprint, compression, expires_at 
+                FROM context_cache 
+                WHERE id IN ({placeholders}){expiry_filter}
                 """
-                db_manager.execute_command(
-                    self.context_db_path, 
-                    update_sql, 
-                    (now, context_id)
-                )
                 
-                return json.loads(results[0]['context_data'])
+                for row in db_manager.execute_query(self.context_db_path, select_sql, params):
+                    touch = touches.get(row['id'])
+                    if touch is not None:
+                        row = {**dict(row), 'source_fingerprint': touch.source_fingerprint,
+                               'expires_at': touch.expires_ns}
+                        if row['expires_at'] <= now_ns:
+                            continue
+                    self._ttl_index[row['id']] = row['expires_at']
+                    results.append(row)
+            
+            # Rows compressed with a codec this process lacks (e.g. zstd written by another
+            # install) are treated as misses and get rewritten
+            results = [row for row in results if row['compression'] in _READABLE_COMPRESSIONS]
+            
+            if require_same_sources:
+                results = [
+                    row for row in results
+                    if row['source_fingerprint'] is not None
+                    and row['source_fingerprint'] == self._source_fingerprint(row['context_type'])
+                ]
+            
+            if results:
+                # Hit statistics are coalesced in memory, keeping the read path write-free
+                self._record_hits([row['id'] for row in results], now_ns)
+            
+            contents = {row['context_type']: self._decode_context_data(row) for row in results}
+            if raw:
+                return contents
+            return {context_type: json_loads(content) for context_type, content in contents.items()}
             
         except Exception as e:
-            mcp_logger.warning(f"Failed to retrieve cached {context_type} context: {e}")
+            mcp_logger.warning(f"Failed to retrieve cached {', '.join(context_types)} context: {e}")
         
-        return None
+        return {}
     
     def _log_performance(self, context_type: str, operation: str, 
                         execution_time_ms: int, cache_hit: bool):
         """Log context operation performance"""
         try:
-            insert_sql = """
-            INSERT INTO context_performance 
-            (context_type, operation, execution_time_ms, cache_hit, timestamp, workspace, dataset)
-            VALUES (?, ?, ?, ?, ?, ?, ?)
-            """
-            
-            db_manager.execute_command(
-                self.context_db_path,
-                insert_sql,
+            self._queue_write(
+                _PERFORMANCE_INSERT_SQL,
                 (context_type, operation, execution_time_ms, cache_hit, 
-                 datetime.now().isoformat(), self.workspace_name, self.dataset_name)
+                 time.time_ns(), self.workspace_name, self.dataset_name)
             )
             
         except Exception as e:
             mcp_logger.warning(f"Failed to log performance: {e}")
     
+    def _log_performance_bulk(self, entries: List[Tuple[str, str, int, bool]]):
+        """Log several (context_type, operation, execution_time_ms, cache_hit) entries at once"""
+        try:
+            timestamp = time.time_ns()
+            for entry in entries:
+                self._queue_write(_PERFORMANCE_INSERT_SQL, (*entry, timestamp, self.workspace_name, self.dataset_name))
+            
+        except Exception as e:
+            mcp_logger.warning(f"Failed to log performance: {e}")
+    
+    def _record_hits(self, context_ids: List[str], now_ns: int):
+        """Count cache hits in memory, queueing them for writing once the flush interval passes"""
+        with self._hit_lock:
+            for context_id in context_ids:
+                self._hit_counts[context_id] += 1
+                self._hit_last_access[context_id] = now_ns
+            flush_due = now_ns - self._last_hit_flush_ns >= _HIT_FLUSH_SECONDS * 1_000_000_000
+        
+        if flush_due:
+            self._queue_hit_counts()
+        else:
+            # The writer thread also flushes hits when it goes idle
+            self._ensure_writer()
+    
+    def _queue_hit_counts(self):
+        """Queue one coalesced UPDATE per context id with hits counted since the last flush"""
+        with self._hit_lock:
+            hit_counts, self._hit_counts = self._hit_counts, Counter()
+            last_access, self._hit_last_access = self._hit_last_access, {}
+            self._last_hit_flush_ns = time.time_ns()
+        
+        for context_id, hits in hit_counts.items():
+            self._queue_write(_CACHE_HIT_SQL, (hits, last_access[context_id], context_id))
+    
+    def _ensure_writer(self):
+        """Start the background writer thread on first use"""
+        if self._writer_thread is None:
+            with self._writer_lock:
+                if self._writer_thread is None:
+                    self._writer_thread = threading.Thread(
+                        target=self._writer_loop, name="context-cache-writer", daemon=True
+                    )
+                    self._writer_thread.start()
+    
+    def _queue_write(self, sql: str, params: tuple,
+                     pending: Optional[Tuple[str, _PendingCacheWrite]] = None):
+        """Queue a cache/performance write for the background writer"""
+        self._ensure_writer()
+        self._write_queue.put((sql, params, pending))
+    
+    def _queue_cache_write(self, context_id: str, write: _PendingCacheWrite, sql: str, params: tuple):
+        """Queue a context_cache write, recording the row state it leaves until it is committed"""
+        with self._pending_lock:
+            self._pending_cache[context_id] = write
+        self._queue_write(sql, params, (context_id, write))
+    
+    def _settle_pending(self, batch: List[_QueuedWrite]):
+        """Forget pending cache writes once the writer has attempted them
+        
+        Only the exact write that was queued is dropped; a newer one for the same id stays.
+        """
+        with self._pending_lock:
+            for _, _, pending in batch:
+                if pending is None:
+                    continue
+                context_id, write = pending
+                if self._pending_cache.get(context_id) is write:
+                    del self._pending_cache[context_id]
+    
+    def _writer_loop(self):
+        """Drain queued writes in single-transaction batches, one executemany per run of identical statements"""
+        while True:
+            try:
+                batch = [self._write_queue.get(timeout=_HIT_FLUSH_SECONDS)]
+            except queue.Empty:
+                # Idle - write out hits counted since the last flush
+                self._queue_hit_counts()
+                continue
+            while len(batch) < 64:
+                try:
+                    batch.append(self._write_queue.get_nowait())
+                except queue.Empty:
+                    break
+            
+            try:
+                # The whole batch is committed at once - one fsync instead of one per statement
+                db_manager.execute_transaction(self.context_db_path, [
+                    (sql, [params for _, params, _ in writes])
+                    for sql, writes in groupby(batch, key=itemgetter(0))
+                ])
+            except Exception as e:
+                # One bad row must not drop the rest of the batch - retry each statement on its own
+                mcp_logger.warning(f"Batch write of {len(batch)} queued context cache entries failed, "
+                                   f"retrying individually: {e}")
+                self._write_individually(batch)
+            finally:
+                self._settle_pending(batch)
+                for _ in batch:
+                    self._write_queue.task_done()
+    
+    def _write_individually(self, batch: List[_QueuedWrite]):
+        """Write queued statements one at a time so a failing row only loses itself"""
+        for sql, params, _ in batch:
+            try:
+                db_manager.execute_command(self.context_db_path, sql, params)
+            except Exception as e:
+                mcp_logger.warning(f"Failed to write queued context cache entry: {e}")
+    
+    def flush_pending_writes(self):
+        """Block until all queued cache/performance writes and counted hits have been written"""
+        if self._writer_thread is None:
+            return  # Nothing has ever been queued
+        self._queue_hit_counts()
+        self._write_queue.join()
+    
     def build_measures_context_cached(self, force_refresh: bool = False) -> Dict[str, Any]:
         """Build measures context with SQLite caching"""
         start_time = datetime.now()
         
-        if not force_refresh:
-            cached = self._get_cached_context('measures')
-            if cached:
-                execution_time = int((datetime.now() - start_time).total_seconds() * 1000)
-                self._log_performance('measures', 'build', execution_time, True)
-                mcp_logger.debug("Measures context served from cache")
-                return cached
+        # force_refresh still reuses the cached context if its sources are unchanged
+        cached = self._get_cached_context('measures', require_same_sources=force_refresh)
+        if cached:
+            execution_time = int((datetime.now() - start_time).total_seconds() * 1000)
+            self._log_performance('measures', 'build', execution_time, True)
+            mcp_logger.debug("Measures context served from cache")
+            return cached
         
         # Build fresh context
         context = self.build_measures_context()
@@ -472,13 +1035,13 @@ class PowerBIContextBuilder:
         """Build schema context with SQLite caching"""
         start_time = datetime.now()
         
-        if not force_refresh:
-            cached = self._get_cached_context('schema')
-            if cached:
-                execution_time = int((datetime.now() - start_time).total_seconds() * 1000)
-                self._log_performance('schema', 'build', execution_time, True)
-                mcp_logger.debug("Schema context served from cache")
-                return cached
+        # force_refresh still reuses the cached context if its sources are unchanged
+        cached = self._get_cached_context('schema', require_same_sources=force_refresh)
+        if cached:
+            execution_time = int((datetime.now() - start_time).total_seconds() * 1000)
+            self._log_performance('schema', 'build', execution_time, True)
+            mcp_logger.debug("Schema context served from cache")
+            return cached
         
         # Build fresh context
         context = self.build_schema_context()
@@ -488,24 +1051,89 @@ class PowerBIContextBuilder:
         return context
     
     def build_financial_hierarchy_context_cached(self, force_refresh: bool = False) -> Dict[str, Any]:
-        """Build financial hierarchy context with SQLite caching"""
+        """Build financial hierarchy context (static, so never read from or written to SQLite)"""
         start_time = datetime.now()
-        
-        if not force_refresh:
-            cached = self._get_cached_context('financial_hierarchy')
-            if cached:
-                execution_time = int((datetime.now() - start_time).total_seconds() * 1000)
-                self._log_performance('financial_hierarchy', 'build', execution_time, True)
-                mcp_logger.debug("Financial hierarchy context served from cache")
-                return cached
-        
-        # Build fresh context
         context = self.build_financial_hierarchy_context()
         execution_time = int((datetime.now() - start_time).total_seconds() * 1000)
-        self._log_performance('financial_hierarchy', 'build', execution_time, False)
+        self._log_performance('financial_hierarchy', 'build', execution_time, True)
         
         return context
     
+    def _collect_sub_contexts(self, force_refresh: bool, start_time: datetime) -> Dict[str, Any]:
+        """Fetch all cached sub-contexts in one query, then build only the misses"""
+        builders = {
+            'measures': self.build_measures_context,
+            'schema': self.build_schema_context
+        }
+        # Under force_refresh, still reuse sub-contexts whose sources have not changed
+        cached = self._get_cached_contexts_bulk(
+            list(builders), require_same_sources=force_refresh
+        )
+        lookup_time = int((datetime.now() - start_time).total_seconds() * 1000)
+        
+        sections = {}
+        performance_entries = []
+        for context_type, build in builders.items():
+            if context_type in cached:
+                sections[context_type] = cached[context_type]
+                performance_entries.append((context_type, 'build', lookup_time, True))
+                mcp_logger.debug(f"{context_type} context served from cache")
+            else:
+                build_start = datetime.now()
+                sections[context_type] = build()
+                build_time = int((datetime.now() - build_start).total_seconds() * 1000)
+                performance_entries.append((context_type, 'build', build_time, False))
+        self._log_performance_bulk(performance_entries)
+        sections['financial_hierarchy'] = self.build_financial_hierarchy_context()
+        
+        return sections
+    
+    def _get_merged_sub_contexts(self, force_refresh: bool, start_time: datetime,
+                                 raw: bool = False) -> Tuple[Any, bool]:
+        """Read all sub-contexts from the single 'complete' row, assembling it on a miss
+        
+        Returns (sections, cache_hit). With raw, sections is the merged JSON object as bytes.
+        """
+        cached = self._get_cached_contexts_bulk(
+            ['complete'], require_same_sources=force_refresh, raw=raw
+        )
+        if 'complete' in cached:
+            mcp_logger.debug("complete context served from cache")
+            return cached['complete'], True
+        
+        sections = self._collect_sub_contexts(force_refresh, start_time)
+        self._cache_context('complete', sections)
+        return (json_dumps_bytes(sections, sort_keys=True) if raw else sections), False
+    
+    def _get_context_envelope(self, start_time: datetime) -> Dict[str, Any]:
+        """Build the parts of the optimized context that surround the sub-contexts"""
+        return {
+            'power_bi_model_info': {
+                'workspace': self.workspace_name,
+                'dataset': self.dataset_name,
+                'last_context_update': start_time.isoformat(),
+                'context_version': '2.0',
+                'cache_enabled': True
+            },
+            
+            # Enhanced quick reference
+            'claude_quick_reference': {
+                'measure_format': 'Use [MeasureName] format in all DAX queries',
+                'table_corrections': 'Check schema.table_name_corrections for actual table names',
+                'financial_hierarchy': 'Use Mapping table lvl1-lvl4 for proper P&L categorization',
+                'performance_mode': 'Context cached for 24h - use force_refresh=True to update',
+                'best_practices': [
+                    'Always use actual measure names from measures.active_mappings',
+                    'Use corrected table names to avoid DAX errors',
+                    'Include financial hierarchy for accurate analysis',
+                    'Give short and precise answers unless asked otherwise'
+                ]
+            },
+            
+            # Enhanced metadata with performance stats
+            'context_metadata': self._get_context_metadata()
+        }
+    
     def build_complete_context_optimized(self, force_refresh: bool = False) -> Dict[str, Any]:
         """Build complete context with performance optimizations"""
         start_time = datetime.now()
@@ -514,42 +1142,24 @@ class PowerBIContextBuilder:
             mcp_logger.info("Building optimized Power BI context with SQLite caching")
             
             # Use cached versions for better performance
+            sections, cache_hit = self._get_merged_sub_contexts(force_refresh, start_time)
+            envelope = self._get_context_envelope(start_time)
             context = {
-                'power_bi_model_info': {
-                    'workspace': self.workspace_name,
-                    'dataset': self.dataset_name,
-                    'last_context_update': datetime.now().isoformat(),
-                    'context_version': '2.0',
-                    'cache_enabled': True
-                },
+                'power_bi_model_info': envelope['power_bi_model_info'],
                 
                 # Core components with caching
-                'measures': self.build_measures_context_cached(force_refresh),
-                'schema': self.build_schema_context_cached(force_refresh), 
-                'financial_hierarchy': self.build_financial_hierarchy_context_cached(force_refresh),
+                'measures': sections['measures'],
+                'schema': sections['schema'], 
+                'financial_hierarchy': sections['financial_hierarchy'],
                 
-                # Enhanced quick reference
-                'claude_quick_reference': {
-                    'measure_format': 'Use [MeasureName] format in all DAX queries',
-                    'table_corrections': 'Check schema.table_name_corrections for actual table names',
-                    'financial_hierarchy': 'Use Mapping table lvl1-lvl4 for proper P&L categorization',
-                    'performance_mode': 'Context cached for 24h - use force_refresh=True to update',
-                    'best_practices': [
-                        'Always use actual measure names from measures.active_mappings',
-                        'Use corrected table names to avoid DAX errors',
-                        'Include financial hierarchy for accurate analysis',
-                        'Give short and precise answers unless asked otherwise'
-                    ]
-                },
-                
-                # Enhanced metadata with performance stats
-                'context_metadata': self._get_context_metadata()
+                'claude_quick_reference': envelope['claude_quick_reference'],
+                'context_metadata': envelope['context_metadata']
             }
             
             execution_time = int((datetime.now() - start_time).total_seconds() * 1000)
             context['context_metadata']['build_time_ms'] = execution_time
             
-            self._log_performance('complete', 'build', execution_time, False)
+            self._log_performance('complete', 'build', execution_time, cache_hit)
             
             measures_count = len(context['measures'].get('active_mappings', {}))
             tables_count = context['schema'].get('total_tables', 0)
@@ -563,69 +1173,54 @@ class PowerBIContextBuilder:
             # Fallback to original method
             return self.build_complete_context()
     
+    def build_complete_context_optimized_bytes(self, force_refresh: bool = False) -> bytes:
+        """Build the optimized context as JSON bytes, splicing cached sub-contexts in unparsed"""
+        start_time = datetime.now()
+        
+        try:
+            mcp_logger.info("Building optimized Power BI context bytes with SQLite caching")
+            
+            merged, cache_hit = self._get_merged_sub_contexts(force_refresh, start_time, raw=True)
+            envelope = self._get_context_envelope(start_time)
+            
+            execution_time = int((datetime.now() - start_time).total_seconds() * 1000)
+            envelope['context_metadata']['build_time_ms'] = execution_time
+            
+            # Both are non-empty objects: reopen the envelope and append the merged members
+            payload = json_dumps_bytes(envelope)[:-1] + b',' + merged[1:]
+            
+            self._log_performance('complete', 'build', execution_time, cache_hit)
+            mcp_logger.info(f"Optimized context bytes built in {execution_time}ms: {len(payload)} bytes")
+            
+            return payload
+            
+        except Exception as e:
+            mcp_logger.error(f"Failed to build optimized context bytes: {e}")
+            # Fallback to original method
+            return json_dumps_bytes(self.build_complete_context())
+    
     def _get_context_metadata(self) -> Dict[str, Any]:
         """Get enhanced context metadata with cache statistics"""
         try:
             # Get cache statistics
-            stats_sql = """
-            SELECT 
-                context_type,
-                COUNT(*) as cache_entries,
-                SUM(hit_count) as total_hits,
-                AVG(hit_count) as avg_hits,
-                MAX(last_accessed) as last_access
-            FROM context_cache 
-            WHERE workspace = ? AND dataset = ?
-            GROUP BY context_type
-            """
-            
-            cache_stats = {}
             try:
                 results = db_manager.execute_query(
                     self.context_db_path, 
-                    stats_sql, 
+                    _CACHE_STATS_SQL, 
                     (self.workspace_name, self.dataset_name)
                 )
-                
-                for row in results:
-                    cache_stats[row['context_type']] = {
-                        'entries': row['cache_entries'],
-                        'total_hits': row['total_hits'],
-                        'avg_hits': round(row['avg_hits'], 2),
-                        'last_access': row['last_access']
-                    }
+                cache_stats = json_loads(results[0]['stats'])
             except Exception:
                 cache_stats = {'error': 'Cache stats unavailable'}
             
             # Get performance statistics
-            perf_sql = """
-            SELECT 
-                context_type,
-                AVG(execution_time_ms) as avg_time,
-                MIN(execution_time_ms) as min_time,
-                MAX(execution_time_ms) as max_time,
-                SUM(CASE WHEN cache_hit THEN 1 ELSE 0 END) * 100.0 / COUNT(*) as cache_hit_rate
-            FROM context_performance 
-            WHERE workspace = ? AND dataset = ? 
-                AND timestamp > datetime('now', '-7 days')
-            GROUP BY context_type
-            """
-            
-            perf_stats = {}
             try:
                 results = db_manager.execute_query(
                     self.context_db_path, 
-                    perf_sql, 
-                    (self.workspace_name, self.dataset_name)
+                    _PERFORMANCE_STATS_SQL, 
+                    (self.workspace_name, self.dataset_name, time.time_ns() - 7 * _NS_PER_DAY)
                 )
-                
-                for row in results:
-                    perf_stats[row['context_type']] = {
-                        'avg_time_ms': round(row['avg_time'], 1),
-                        'min_time_ms': row['min_time'],
-                        'max_time_ms': row['max_time'],
-                        'cache_hit_rate': round(row['cache_hit_rate'], 1)
-                    }
+                perf_stats = json_loads(results[0]['stats'])
             except Exception:
                 perf_stats = {'error': 'Performance stats unavailable'}
             
@@ -653,11 +1248,13 @@ class PowerBIContextBuilder:
     def clear_context_cache(self, context_type: Optional[str] = None) -> Dict[str, Any]:
         """Clear context cache (all or specific type)"""
         try:
+            # Land queued writes first so none of them re-creates a row after the delete
+            self.flush_pending_writes()
+            self._content_version += 1
             if context_type:
-                delete_sql = "DELETE FROM context_cache WHERE context_type = ? AND workspace = ? AND dataset = ?"
                 affected = db_manager.execute_command(
                     self.context_db_path, 
-                    delete_sql, 
+                    _CACHE_DELETE_BY_TYPE_SQL, 
                     (context_type, self.workspace_name, self.dataset_name)
                 )
                 return {
@@ -665,10 +1262,9 @@ class PowerBIContextBuilder:
                     'message': f'Cleared {affected} {context_type} cache entries'
                 }
             else:
-                delete_sql = "DELETE FROM context_cache WHERE workspace = ? AND dataset = ?"
                 affected = db_manager.execute_command(
                     self.context_db_path, 
-                    delete_sql, 
+                    _CACHE_DELETE_ALL_SQL, 
                     (self.workspace_name, self.dataset_name)
                 )
                 return {
@@ -683,52 +1279,50 @@ class PowerBIContextBuilder:
                 'error': str(e)
             }
     
-    def get_context_cache_info(self) -> Dict[str, Any]:
-        """Get detailed context cache information"""
+    def get_context_cache_info(self, summary_only: bool = False, limit: int = 100) -> Dict[str, Any]:
+        """Get detailed context cache information
+        
+        Totals are read from context_cache_stats; summary_only skips fetching the (at most
+        limit) per-entry rows.
+        """
         try:
-            info_sql = """
-            SELECT 
-                context_type,
-                created_at,
-                expires_at,
-                hit_count,
-                last_accessed,
-                CASE 
-                    WHEN expires_at > datetime('now') THEN 'valid'
-                    ELSE 'expired'
-                END as status,
-                LENGTH(context_data) as size_bytes
-            FROM context_cache 
-            WHERE workspace = ? AND dataset = ?
-            ORDER BY context_type, created_at DESC
-            """
+            now_ns = time.time_ns()
+            summary = db_manager.execute_query(
+                self.context_db_path, 
+                _CACHE_SUMMARY_SQL, 
+                (self.workspace_name, self.dataset_name, now_ns, self.workspace_name, self.dataset_name)
+            )[0]
+            
+            info = {
+                'workspace': self.workspace_name,
+                'dataset': self.dataset_name,
+                'total_entries': summary['total_entries'],
+                'valid_entries': summary['valid_entries'],
+                'total_size_kb': summary['total_size_kb']
+            }
+            if summary_only:
+                return info
             
             results = db_manager.execute_query(
                 self.context_db_path, 
-                info_sql, 
-                (self.workspace_name, self.dataset_name)
+                _CACHE_INFO_SQL, 
+                (now_ns, self.workspace_name, self.dataset_name, limit)
             )
             
-            cache_info = []
-            for row in results:
-                cache_info.append({
+            info['cache_entries'] = [
+                {
                     'context_type': row['context_type'],
-                    'created_at': row['created_at'],
-                    'expires_at': row['expires_at'],
+                    'created_at': _ns_to_iso(row['created_at']),
+                    'expires_at': _ns_to_iso(row['expires_at']),
                     'hit_count': row['hit_count'],
-                    'last_accessed': row['last_accessed'],
-                    'status': row['status'],
+                    'last_accessed': _ns_to_iso(row['last_accessed']),
+                    'status': 'valid' if row['is_valid'] else 'expired',
                     'size_kb': round(row['size_bytes'] / 1024, 2)
-                })
+                }
+                for row in results
+            ]
             
-            return {
-                'workspace': self.workspace_name,
-                'dataset': self.dataset_name,
-                'cache_entries': cache_info,
-                'total_entries': len(cache_info),
-                'valid_entries': sum(1 for entry in cache_info if entry['status'] == 'valid'),
-                'total_size_kb': sum(entry['size_kb'] for entry in cache_info)
-            }
+            return info
             
         except Exception as e:
             mcp_logger.error(f"Failed to get cache info: {e}")
@@ -740,4 +1334,7 @@ class PowerBIContextBuilder:
 
 
 # Global context builder instance
-powerbi_context_builder = PowerBIContextBuilder()
\ No newline at end of file
+powerbi_context_builder = PowerBIContextBuilder()
+
+# The writer is a daemon thread, so drain it (and unwritten hit counts) before the interpreter exits
+atexit.register(powerbi_context_builder.flush_pending_writes)
\ No newline at end of file
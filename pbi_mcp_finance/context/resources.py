@@ -4,20 +4,166 @@ These resources automatically provide Power BI model context to Claude at conver
 """
 
 from fastmcp import FastMCP
-from typing import Dict, Any
+from typing import Dict, Any, List, Optional, Tuple
 import asyncio
 import threading
+import time
 
 from .builder import powerbi_context_builder
 from ..utils.logging import mcp_logger
 from ..config.settings import settings
+from ..utils.serialization import json_dumps_bytes
+
+
+# In-process memo of resource payloads, keyed by (uri, workspace, dataset). Each entry is
+# [expires_at (monotonic), context version, serialized JSON payload, hit count]
+_RESOURCE_TTL_SECONDS = 300
+_RESOURCE_CACHE_MAX_ENTRIES = 64
+_resource_cache: Dict[Tuple[str, Optional[str], Optional[str]], List[Any]] = {}
+
+
+# Static payload fragments, built once and attached by reference (never mutated)
+_CRITICAL_RULES = {
+    'rule_1': 'First response MUST be select_powerbi_model() tool - NO exceptions',  
+    'rule_2': 'Show workspaces with models - NO suggestions, NO recommendations',
+    'rule_3': 'NEVER suggest which model to use - let user choose',
+    'rule_4': 'Ask "Which model would you like to choose? Do you want me to proceed with [user question]?"'
+}
+
+_GUIDANCE_RESOURCE_INFO = {
+    'resource_type': 'powerbi_model_selection_guidance',
+    'auto_injected': True,
+    'requires_user_input': True,
+    'workflow': 'select_powerbi_model() → discover_model(workspace, dataset)',
+    'usage': 'Interactive model selection and discovery process'
+}
+
+_MEASURES_CRITICAL_WARNING = {
+    'message': 'ALWAYS use existing measures - NEVER recreate what already exists',
+    'instruction_1': 'Check discovered_measures section before any calculations',
+    'instruction_2': 'Use exact measure names in DAX queries',
+    'instruction_3': 'If revenue/profit requested, use existing measures first'
+}
+
+_MEASURES_RESOURCE_INFO = {
+    'resource_type': 'powerbi_measures',
+    'replaces_tool': 'discover_measures()',
+    'priority': 'HIGHEST - Check before any financial analysis',
+    'usage': 'Use measures.active_mappings for generic→actual name conversions'
+}
+
+_DATE_TABLE_PRIORITY = {
+    'most_important_table': '_Date',
+    'common_error': 'Using Date instead of _Date',
+    'correct_syntax': "YEAR(_Date[Date]) = 2024",
+    'incorrect_syntax': "YEAR(Date[Date]) = 2024",
+    'note': '_Date table contains the proper date dimension for filtering'
+}
+
+_SCHEMA_RESOURCE_INFO = {
+    'resource_type': 'powerbi_schema',  
+    'replaces_tool': 'analyze_model_schema()',
+    'priority': 'HIGH - _Date table syntax is critical for date filtering',
+    'usage': 'ALWAYS use _Date table for date filtering, not Date table'
+}
+
+_HIERARCHY_RESOURCE_INFO = {
+    'resource_type': 'powerbi_financial_hierarchy',
+    'replaces_tool': 'analyze_mapping_structure()',
+    'usage': 'Use for proper P&L categorization and EBITDA analysis'
+}
+
+_QUICK_REFERENCE_DETAILS = {
+    'measure_mappings': 'powerbi://measures',
+    'table_corrections': 'powerbi://schema'
+}
+
+_DISCOVERY_TOOLS = {
+    'model_selection': 'select_powerbi_model() - Choose workspace and dataset',
+    'complete_discovery': 'discover_model(workspace, dataset) - Run all discovery functions',
+    'individual_discovery': 'auto_discover_measures(), auto_discover_schema(), auto_discover_workspace_info()',
+    'custom_mappings': 'configure_measure_mappings(...) - Custom measure mappings'
+}
+
+# Invariant part of the model selection guidance; only default_config varies per call
+_GUIDANCE_CONTEXT_BASE = {
+    'model_selection_required': True,
+    'FIRST_RESPONSE_REQUIRED': 'Always start with select_powerbi_model() to show simple workspace list',
+    'instruction': 'MANDATORY: The VERY FIRST response to ANY query must ONLY be select_powerbi_model() tool. No other tools, no analysis, no suggestions until model is selected.',
+    'critical_rules': _CRITICAL_RULES,
+    'available_tools': {
+        'select_powerbi_model': 'Shows available workspaces and guides model selection',
+        'discover_model': 'Runs complete discovery for specified workspace/dataset'
+    },
+    'discovery_functions': {
+        'auto_discover_workspace_info': 'Get workspace and dataset information',
+        'auto_discover_measures': 'Discover and categorize all measures',
+        'auto_discover_schema': 'Analyze model schema and table structure',
+        'auto_discover_financial_hierarchy': 'Analyze financial hierarchy (lvl1-lvl4)'
+    },
+    'cache_info': {
+        'duration': '6 hours',
+        'refresh_option': 'Use force_refresh=True to override cache',
+        'automatic_refresh': 'Cache refreshes automatically when expired'
+    },
+    '_resource_info': _GUIDANCE_RESOURCE_INFO,
+    'auto_discovery_disabled': True,
+    'strict_workflow_required': True
+}
+
+
+def _build_guidance_context(has_defaults: bool, default_workspace: Optional[str],
+                            default_dataset: Optional[str]) -> Dict[str, Any]:
+    """Build guidance context for model selection"""
+    context = dict(_GUIDANCE_CONTEXT_BASE)
+    context['default_config'] = {
+        'available': has_defaults,
+        'workspace': default_workspace if has_defaults else None,
+        'dataset': default_dataset if has_defaults else None,
+        'usage': 'Say "Use default model" to use these settings' if has_defaults else None
+    }
+    return context
+
+
+def _resource_key(uri: str) -> Tuple[str, Optional[str], Optional[str]]:
+    return uri, powerbi_context_builder.workspace_name, powerbi_context_builder.dataset_name
+
+
+def _to_json_text(payload: Dict[str, Any]) -> str:
+    """Serialize a resource payload with the orjson-backed helper, bypassing FastMCP's encoder"""
+    return json_dumps_bytes(payload).decode('utf-8')
+
+
+def _get_memoized_resource(uri: str, context_types: Tuple[str, ...]) -> Optional[str]:
+    """Return a memoized payload if it is within its TTL and its contexts are unchanged"""
+    entry = _resource_cache.get(_resource_key(uri))
+    if entry is None or entry[0] < time.monotonic():
+        return None
+    version = powerbi_context_builder.get_context_version(context_types)
+    if version is None or entry[1] != version:
+        return None
+    entry[3] += 1
+    return entry[2]
+
+
+def _memoize_resource(uri: str, context_types: Tuple[str, ...], payload: Dict[str, Any]) -> str:
+    """Serialize a freshly built payload and remember it, evicting the least-hit entry when full"""
+    text = _to_json_text(payload)
+    version = powerbi_context_builder.get_context_version(context_types)
+    if version is None or 'error' in payload:
+        return text
+    key = _resource_key(uri)
+    if key not in _resource_cache and len(_resource_cache) >= _RESOURCE_CACHE_MAX_ENTRIES:
+        del _resource_cache[min(_resource_cache, key=lambda k: _resource_cache[k][3])]
+    _resource_cache[key] = [time.monotonic() + _RESOURCE_TTL_SECONDS, version, text, 0]
+    return text
 
 
 def register_context_resources(mcp: FastMCP):
     """Register Power BI context resources for automatic injection"""
     
-    @mcp.resource("powerbi://complete-context")
-    def get_complete_powerbi_context() -> Dict[str, Any]:
+    @mcp.resource("powerbi://complete-context", mime_type="application/json")
+    async def get_complete_powerbi_context() -> str:
         """
         Power BI context resource - automatically discovers model if defaults available,
         otherwise provides guidance for model selection.
@@ -33,82 +179,32 @@ def register_context_resources(mcp: FastMCP):
             default_dataset = settings.default_dataset_name
             has_defaults = bool(default_workspace and default_dataset)
             
-            context = {}
-            
             # ALWAYS require explicit model selection - no auto-discovery
             # This ensures LLM always asks user to select workspace/dataset first
-            context = self._build_guidance_context(has_defaults, default_workspace, default_dataset)
-            context['model_selection_required'] = True
-            context['auto_discovery_disabled'] = True
-            context['strict_workflow_required'] = True
+            context = _build_guidance_context(has_defaults, default_workspace, default_dataset)
             
             # Always try to include available measures context even if main discovery fails
             try:
-                measures_context = powerbi_context_builder.build_measures_context()
-                if measures_context and measures_context.get('measures'):
+                measures_context = await asyncio.to_thread(powerbi_context_builder.build_measures_context)
+                # build_measures_context has no 'measures' key; the error fallback has no total_measures
+                if measures_context.get('total_measures'):
                     context['available_measures'] = measures_context
             except Exception as measures_error:
                 mcp_logger.debug(f"Could not include measures context: {measures_error}")
             
             mcp_logger.info("📋 Power BI context provided successfully")
-            return context
+            return _to_json_text(context)
             
         except Exception as e:
             mcp_logger.error(f"Failed to build complete Power BI context: {e}")
-            return {
+            return _to_json_text({
                 'error': 'Complete context failed',
                 'fallback': 'Use select_powerbi_model() tool to begin model selection',
                 'error_details': str(e)
-            }
+            })
     
-    def _build_guidance_context(self, has_defaults: bool, default_workspace: str, default_dataset: str) -> Dict[str, Any]:
-        """Build guidance context for model selection"""
-        context = {
-            'model_selection_required': True,
-            'FIRST_RESPONSE_REQUIRED': 'Always start with select_powerbi_model() to show simple workspace list',
-            'instruction': 'MANDATORY: The VERY FIRST response to ANY query must ONLY be select_powerbi_model() tool. No other tools, no analysis, no suggestions until model is selected.',
-            'critical_rules': {
-                'rule_1': 'First response MUST be select_powerbi_model() tool - NO exceptions',  
-                'rule_2': 'Show workspaces with models - NO suggestions, NO recommendations',
-                'rule_3': 'NEVER suggest which model to use - let user choose',
-                'rule_4': 'Ask "Which model would you like to choose? Do you want me to proceed with [user question]?"'
-            },
-            'available_tools': {
-                'select_powerbi_model': 'Shows available workspaces and guides model selection',
-                'discover_model': 'Runs complete discovery for specified workspace/dataset'
-            },
-            'default_config': {
-                'available': has_defaults,
-                'workspace': default_workspace if has_defaults else None,
-                'dataset': default_dataset if has_defaults else None,
-                'usage': 'Say "Use default model" to use these settings' if has_defaults else None
-            },
-            'discovery_functions': {
-                'auto_discover_workspace_info': 'Get workspace and dataset information',
-                'auto_discover_measures': 'Discover and categorize all measures',
-                'auto_discover_schema': 'Analyze model schema and table structure',
-                'auto_discover_financial_hierarchy': 'Analyze financial hierarchy (lvl1-lvl4)'
-            },
-            'cache_info': {
-                'duration': '6 hours',
-                'refresh_option': 'Use force_refresh=True to override cache',
-                'automatic_refresh': 'Cache refreshes automatically when expired'
-            }
-        }
-        
-        # Add resource metadata
-        context['_resource_info'] = {
-            'resource_type': 'powerbi_model_selection_guidance',
-            'auto_injected': True,
-            'requires_user_input': True,
-            'workflow': 'select_powerbi_model() → discover_model(workspace, dataset)',
-            'usage': 'Interactive model selection and discovery process'
-        }
-        
-        return context
-    
-    @mcp.resource("powerbi://measures")
-    def get_measures_context() -> Dict[str, Any]:
+    @mcp.resource("powerbi://measures", mime_type="application/json")
+    async def get_measures_context() -> str:
         """
         ⚠️ CRITICAL: Power BI measures context - ALWAYS USE EXISTING MEASURES!
         
@@ -123,31 +219,25 @@ def register_context_resources(mcp: FastMCP):
         """
         try:
             mcp_logger.debug("Providing measures context - CRITICAL for preventing measure recreation")
-            context = powerbi_context_builder.build_measures_context()
+            memoized = _get_memoized_resource("powerbi://measures", ('measures',))
+            if memoized is not None:
+                return memoized
             
-            # Add critical warnings about using existing measures
-            context['CRITICAL_WARNING'] = {
-                'message': 'ALWAYS use existing measures - NEVER recreate what already exists',
-                'instruction_1': 'Check discovered_measures section before any calculations',
-                'instruction_2': 'Use exact measure names in DAX queries',
-                'instruction_3': 'If revenue/profit requested, use existing measures first'
-            }
+            # SQLite-backed build runs in a worker thread so the event loop keeps serving
+            context = await asyncio.to_thread(powerbi_context_builder.build_measures_context)
             
-            context['_resource_info'] = {
-                'resource_type': 'powerbi_measures',
-                'replaces_tool': 'discover_measures()',
-                'priority': 'HIGHEST - Check before any financial analysis',
-                'usage': 'Use measures.active_mappings for generic→actual name conversions'
-            }
+            # Add critical warnings about using existing measures
+            context['CRITICAL_WARNING'] = _MEASURES_CRITICAL_WARNING
+            context['_resource_info'] = _MEASURES_RESOURCE_INFO
             
-            return context
+            return _memoize_resource("powerbi://measures", ('measures',), context)
             
         except Exception as e:
             mcp_logger.error(f"Failed to build measures context: {e}")
-            return {'error': 'Measures context unavailable', 'fallback': 'discover_measures()'}
+            return _to_json_text({'error': 'Measures context unavailable', 'fallback': 'discover_measures()'})
     
-    @mcp.resource("powerbi://schema")
-    def get_schema_context() -> Dict[str, Any]:
+    @mcp.resource("powerbi://schema", mime_type="application/json")
+    async def get_schema_context() -> str:
         """
         Power BI model schema context - _Date table is MOST IMPORTANT for date filtering.
         
@@ -160,32 +250,24 @@ def register_context_resources(mcp: FastMCP):
         """
         try:
             mcp_logger.debug("Providing schema context with _Date table priority")
-            context = powerbi_context_builder.build_schema_context()
+            memoized = _get_memoized_resource("powerbi://schema", ('schema',))
+            if memoized is not None:
+                return memoized
             
-            # Add special emphasis on _Date table
-            context['DATE_TABLE_PRIORITY'] = {
-                'most_important_table': '_Date',
-                'common_error': 'Using Date instead of _Date',
-                'correct_syntax': "YEAR(_Date[Date]) = 2024",
-                'incorrect_syntax': "YEAR(Date[Date]) = 2024",
-                'note': '_Date table contains the proper date dimension for filtering'
-            }
+            context = await asyncio.to_thread(powerbi_context_builder.build_schema_context)
             
-            context['_resource_info'] = {
-                'resource_type': 'powerbi_schema',  
-                'replaces_tool': 'analyze_model_schema()',
-                'priority': 'HIGH - _Date table syntax is critical for date filtering',
-                'usage': 'ALWAYS use _Date table for date filtering, not Date table'
-            }
+            # Add special emphasis on _Date table
+            context['DATE_TABLE_PRIORITY'] = _DATE_TABLE_PRIORITY
+            context['_resource_info'] = _SCHEMA_RESOURCE_INFO
             
-            return context
+            return _memoize_resource("powerbi://schema", ('schema',), context)
             
         except Exception as e:
             mcp_logger.error(f"Failed to build schema context: {e}")
-            return {'error': 'Schema context unavailable', 'fallback': 'analyze_model_schema()'}
+            return _to_json_text({'error': 'Schema context unavailable', 'fallback': 'analyze_model_schema()'})
     
-    @mcp.resource("powerbi://financial-hierarchy")
-    def get_financial_hierarchy_context() -> Dict[str, Any]:
+    @mcp.resource("powerbi://financial-hierarchy", mime_type="application/json")
+    def get_financial_hierarchy_context() -> str:
         """
         Financial statement hierarchy context (Mapping table structure).
         
@@ -198,29 +280,42 @@ def register_context_resources(mcp: FastMCP):
             mcp_logger.debug("Providing financial hierarchy context")
             context = powerbi_context_builder.build_financial_hierarchy_context()
             
-            context['_resource_info'] = {
-                'resource_type': 'powerbi_financial_hierarchy',
-                'replaces_tool': 'analyze_mapping_structure()',
-                'usage': 'Use for proper P&L categorization and EBITDA analysis'
-            }
+            context['_resource_info'] = _HIERARCHY_RESOURCE_INFO
             
-            return context
+            return _to_json_text(context)
             
         except Exception as e:
             mcp_logger.error(f"Failed to build hierarchy context: {e}")
-            return {'error': 'Hierarchy context unavailable', 'fallback': 'analyze_mapping_structure()'}
+            return _to_json_text({'error': 'Hierarchy context unavailable', 'fallback': 'analyze_mapping_structure()'})
     
-    @mcp.resource("powerbi://quick-reference") 
-    def get_quick_reference() -> Dict[str, Any]:
+    @mcp.resource("powerbi://quick-reference", mime_type="application/json")
+    async def get_quick_reference() -> str:
         """
         Quick reference guide for Power BI interactions.
         
         Provides condensed guidance for immediate use without querying tools.
+        Measure mappings and table corrections are only included when
+        settings.quick_reference_full is enabled.
         """
         try:
-            # Get current mappings for quick reference
-            measures_context = powerbi_context_builder.build_measures_context()
-            schema_context = powerbi_context_builder.build_schema_context()
+            if not settings.quick_reference_full:
+                # Navigation hints only - no SQLite-backed context builds
+                return _to_json_text({
+                    'workspace': powerbi_context_builder.workspace_name,
+                    'dataset': powerbi_context_builder.dataset_name,
+                    'discovery_tools': _DISCOVERY_TOOLS,
+                    'details': _QUICK_REFERENCE_DETAILS
+                })
+            
+            memoized = _get_memoized_resource("powerbi://quick-reference", ('measures', 'schema'))
+            if memoized is not None:
+                return memoized
+            
+            # Get current mappings for quick reference - both builds run concurrently
+            measures_context, schema_context = await asyncio.gather(
+                asyncio.to_thread(powerbi_context_builder.build_measures_context),
+                asyncio.to_thread(powerbi_context_builder.build_schema_context)
+            )
             
             quick_ref = {
                 'workspace': powerbi_context_builder.workspace_name,
@@ -241,19 +336,14 @@ def register_context_resources(mcp: FastMCP):
                 },
                 
                 # Tools for model selection and discovery
-                'discovery_tools': {
-                    'model_selection': 'select_powerbi_model() - Choose workspace and dataset',
-                    'complete_discovery': 'discover_model(workspace, dataset) - Run all discovery functions',
-                    'individual_discovery': 'auto_discover_measures(), auto_discover_schema(), auto_discover_workspace_info()',
-                    'custom_mappings': 'configure_measure_mappings(...) - Custom measure mappings'
-                }
+                'discovery_tools': _DISCOVERY_TOOLS
             }
             
-            return quick_ref
+            return _memoize_resource("powerbi://quick-reference", ('measures', 'schema'), quick_ref)
             
         except Exception as e:
             mcp_logger.error(f"Failed to build quick reference: {e}")
-            return {'error': 'Quick reference unavailable'}
+            return _to_json_text({'error': 'Quick reference unavailable'})
     
     # Log successful registration
     mcp_logger.info("Registered Power BI context resources with USER-DRIVEN DISCOVERY:")
@@ -2,10 +2,14 @@
 Database connection utilities for Power BI MCP Finance Server
 """
 
+import queue
 import sqlite3
 import threading
+import weakref
+from collections import namedtuple
 from contextlib import contextmanager
-from typing import Generator, Optional, Any, Dict, List
+from functools import lru_cache
+from typing import Generator, Optional, Any, Dict, List, Tuple
 from pathlib import Path
 
 from ..config.settings import settings
@@ -13,53 +17,175 @@ from ..utils.logging import database_logger
 from ..utils.exceptions import DatabaseConnectionError
 
 
+# Applied to new connections when settings.sqlite_tuning_enabled. journal_mode is
+# persistent in the database file, so only the writer sets it; the rest are per-connection.
+_WRITER_PRAGMAS = (
+    "PRAGMA journal_mode=WAL",
+    "PRAGMA synchronous=NORMAL"  # Safe with WAL - no fsync on every commit
+)
+_CONNECTION_PRAGMAS = (
+    "PRAGMA cache_size=-65536",  # 64 MB page cache
+    "PRAGMA temp_store=MEMORY",
+    "PRAGMA mmap_size=268435456",  # 256 MB
+    "PRAGMA busy_timeout=30000"  # Matches the connect timeout
+)
+
+# One row of PRAGMA table_info, in column order
+TableColumnInfo = namedtuple('TableColumnInfo', 'cid name type notnull dflt_value pk')
+
+
+@lru_cache(maxsize=256)
+def _normalize_sql(sql: str) -> str:
+    """Strip per-line indentation so equivalent statements share one prepared-statement cache entry
+    
+    Statements in this codebase never contain multi-line string literals, so line
+    edges are safe to trim. Scripts are not normalized.
+    """
+    return '\n'.join(line.strip() for line in sql.strip().splitlines())
+
+
+class _TrackedConnection(sqlite3.Connection):
+    """SQLite connection that supports weak references, so open connections can be tracked"""
+    
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        # Schema name -> path of databases ATTACHed to this connection
+        self.attached_databases: Dict[str, str] = {}
+
+
+class _ConnectionPool:
+    """One serialized writer plus a bounded pool of read-only connections for a database"""
+    
+    def __init__(self, writer: sqlite3.Connection, max_readers: int):
+        self.writer = writer
+        # Re-entrant so nested get_connection blocks on one database do not deadlock
+        self.write_lock = threading.RLock()
+        self.idle_readers: "queue.LifoQueue[sqlite3.Connection]" = queue.LifoQueue()
+        self.reader_slots = threading.BoundedSemaphore(max_readers)
+
+
 class DatabaseManager:
-    """Thread-safe SQLite database connection manager"""
+    """Thread-safe SQLite database connection manager
+    
+    Each database gets a single writer connection, serialized by a lock, and up to
+    settings.sqlite_max_readers read-only connections so queries run in parallel.
+    """
     
     def __init__(self):
-        self._connections = threading.local()
-        self._lock = threading.Lock()
+        self._pools: Dict[str, _ConnectionPool] = {}
+        self._lock = threading.RLock()
+        # Every open connection, so close_connections reaches idle and checked-out ones
+        self._all_connections: "weakref.WeakSet[sqlite3.Connection]" = weakref.WeakSet()
+    
+    def _connect(self, db_path: Path, read_only: bool = False) -> sqlite3.Connection:
+        """Open a tuned connection (read-only connections use a mode=ro URI)"""
+        try:
+            conn = sqlite3.connect(
+                f"{Path(db_path).absolute().as_uri()}?mode=ro" if read_only else str(db_path),
+                # Pooled connections move between threads; the writer lock and the reader
+                # pool ensure only one thread uses a connection at a time
+                check_same_thread=False,
+                timeout=30.0,
+                cached_statements=256,  # Connections are long-lived, so reuse parsed statements
+                factory=_TrackedConnection,
+                uri=read_only
+            )
+            conn.row_factory = sqlite3.Row  # Enable column access by name
+            if settings.sqlite_tuning_enabled:
+                for pragma in (_CONNECTION_PRAGMAS if read_only else _WRITER_PRAGMAS + _CONNECTION_PRAGMAS):
+                    conn.execute(pragma)
+            with self._lock:
+                self._all_connections.add(conn)
+            database_logger.debug(f"Created new {'read' if read_only else 'write'} connection to {db_path}")
+            return conn
+        except Exception as e:
+            database_logger.error(f"Failed to connect to {db_path}: {e}")
+            raise DatabaseConnectionError(f"Cannot connect to database: {e}")
     
-    def _get_connection(self, db_path: Path) -> sqlite3.Connection:
-        """Get thread-local database connection"""
+    def _get_pool(self, db_path: Path) -> _ConnectionPool:
+        """Get the connection pool for a database, opening its writer on first use"""
         db_key = str(db_path)
-        
-        if not hasattr(self._connections, db_key):
+        pool = self._pools.get(db_key)
+        if pool is None:
+            with self._lock:
+                pool = self._pools.get(db_key)
+                if pool is None:
+                    # The writer creates the database file, so readers can open it read-only
+                    pool = _ConnectionPool(self._connect(db_path), settings.sqlite_max_readers)
+                    self._pools[db_key] = pool
+        return pool
+    
+    @contextmanager
+    def get_write_connection(self, db_path: Path) -> Generator[sqlite3.Connection, None, None]:
+        """Hold the database's single writer connection, rolling back on error"""
+        pool = self._get_pool(db_path)
+        with pool.write_lock:
             try:
-                conn = sqlite3.connect(
-                    str(db_path),
-                    check_same_thread=False,
-                    timeout=30.0
-                )
-                conn.row_factory = sqlite3.Row  # Enable column access by name
-                setattr(self._connections, db_key, conn)
-                database_logger.debug(f"Created new connection to {db_path}")
+                yield pool.writer
             except Exception as e:
-                database_logger.error(f"Failed to connect to {db_path}: {e}")
-                raise DatabaseConnectionError(f"Cannot connect to database: {e}")
+                # Failed reads on the writer never opened a transaction, so there is nothing to undo
+                if pool.writer.in_transaction:
+                    pool.writer.rollback()
+                database_logger.error(f"Database operation failed: {e}")
+                raise
+    
+    @contextmanager
+    def get_read_connection(self, db_path: Path) -> Generator[sqlite3.Connection, None, None]:
+        """Borrow a read-only connection from the pool, waiting if all are in use"""
+        pool = self._get_pool(db_path)
+        with pool.reader_slots:
+            try:
+                conn = pool.idle_readers.get_nowait()
+            except queue.Empty:
+                conn = self._connect(db_path, read_only=True)
+            try:
+                yield conn
+            except Exception as e:
+                database_logger.error(f"Database operation failed: {e}")
+                raise
+            finally:
+                pool.idle_readers.put(conn)
+    
+    @contextmanager
+    def get_attached_read_connection(self, db_path: Path, 
+                                     attach: Dict[str, Path]) -> Generator[sqlite3.Connection, None, None]:
+        """Borrow a read-only connection with other databases ATTACHed under the given schema names
         
-        return getattr(self._connections, db_key)
+        Queries can then reference e.g. metrics.tool_confusion and join across databases
+        in SQLite rather than in Python. Attachments stay on the pooled connection for reuse.
+        """
+        for other_path in attach.values():
+            # The other database's writer creates its file, so it can be attached read-only
+            self._get_pool(other_path)
+        with self.get_read_connection(db_path) as conn:
+            for schema, other_path in attach.items():
+                if conn.attached_databases.get(schema) == str(other_path):
+                    continue
+                if not schema.isidentifier():
+                    raise DatabaseConnectionError(f"Invalid schema name: {schema}")
+                if schema in conn.attached_databases:
+                    conn.execute(f"DETACH DATABASE {schema}")
+                    del conn.attached_databases[schema]
+                conn.execute(
+                    f"ATTACH DATABASE ? AS {schema}",
+                    (f"{Path(other_path).absolute().as_uri()}?mode=ro",)
+                )
+                conn.attached_databases[schema] = str(other_path)
+            yield conn
     
     @contextmanager
     def get_connection(self, db_path: Path) -> Generator[sqlite3.Connection, None, None]:
-        """Get database connection with automatic cleanup"""
-        conn = None
-        try:
-            conn = self._get_connection(db_path)
+        """Get database connection with automatic cleanup (the writer, usable for reads and writes)"""
+        with self.get_write_connection(db_path) as conn:
             yield conn
-        except Exception as e:
-            if conn:
-                conn.rollback()
-            database_logger.error(f"Database operation failed: {e}")
-            raise
     
     def execute_query(self, db_path: Path, query: str, 
                      params: Optional[tuple] = None) -> List[sqlite3.Row]:
         """Execute SELECT query and return results"""
-        with self.get_connection(db_path) as conn:
+        with self.get_read_connection(db_path) as conn:
             try:
                 cursor = conn.cursor()
-                cursor.execute(query, params or ())
+                cursor.execute(_normalize_sql(query), params or ())
                 results = cursor.fetchall()
                 database_logger.debug(f"Query returned {len(results)} rows")
                 return results
@@ -67,13 +193,24 @@ class DatabaseManager:
                 database_logger.error(f"Query execution failed: {e}")
                 raise DatabaseConnectionError(f"Query failed: {e}")
     
+    def execute_scalar(self, db_path: Path, query: str, 
+                      params: Optional[tuple] = None) -> Any:
+        """Execute SELECT query and return the first column of the first row, or None"""
+        with self.get_read_connection(db_path) as conn:
+            try:
+                row = conn.execute(_normalize_sql(query), params or ()).fetchone()
+                return row[0] if row is not None else None
+            except Exception as e:
+                database_logger.error(f"Scalar query execution failed: {e}")
+                raise DatabaseConnectionError(f"Scalar query failed: {e}")
+    
     def execute_command(self, db_path: Path, command: str, 
                        params: Optional[tuple] = None) -> int:
         """Execute INSERT/UPDATE/DELETE command"""
         with self.get_connection(db_path) as conn:
             try:
                 cursor = conn.cursor()
-                cursor.execute(command, params or ())
+                cursor.execute(_normalize_sql(command), params or ())
                 conn.commit()
                 affected_rows = cursor.rowcount
                 database_logger.debug(f"Command affected {affected_rows} rows")
@@ -101,7 +238,7 @@ class DatabaseManager:
         with self.get_connection(db_path) as conn:
             try:
                 cursor = conn.cursor()
-                cursor.executemany(command, params_list)
+                cursor.executemany(_normalize_sql(command), params_list)
                 conn.commit()
                 affected_rows = cursor.rowcount
                 database_logger.debug(f"Batch command affected {affected_rows} rows")
@@ -110,40 +247,57 @@ class DatabaseManager:
                 database_logger.error(f"Batch command execution failed: {e}")
                 raise DatabaseConnectionError(f"Batch command failed: {e}")
     
+    def execute_transaction(self, db_path: Path, 
+                            operations: List[Tuple[str, List[tuple]]]) -> int:
+        """Execute several (command, params_list) batches in one transaction with a single commit"""
+        with self.get_connection(db_path) as conn:
+            try:
+                cursor = conn.cursor()
+                affected_rows = 0
+                for command, params_list in operations:
+                    cursor.executemany(_normalize_sql(command), params_list)
+                    affected_rows += cursor.rowcount
+                conn.commit()
+                database_logger.debug(f"Transaction of {len(operations)} batches affected {affected_rows} rows")
+                return affected_rows
+            except Exception as e:
+                database_logger.error(f"Transaction execution failed: {e}")
+                raise DatabaseConnectionError(f"Transaction failed: {e}")
+    
     def table_exists(self, db_path: Path, table_name: str) -> bool:
         """Check if table exists in database"""
         query = """
-            SELECT COUNT(*) 
+            SELECT 1 
             FROM sqlite_master 
             WHERE type='table' AND name=?
+            LIMIT 1
         """
         try:
-            results = self.execute_query(db_path, query, (table_name,))
-            return results[0][0] > 0
+            return self.execute_scalar(db_path, query, (table_name,)) is not None
         except Exception:
             return False
     
-    def get_table_info(self, db_path: Path, table_name: str) -> List[Dict[str, Any]]:
+    def get_table_info(self, db_path: Path, table_name: str) -> List[TableColumnInfo]:
         """Get table schema information"""
         query = f"PRAGMA table_info({table_name})"
         try:
             results = self.execute_query(db_path, query)
-            return [dict(row) for row in results]
+            return [TableColumnInfo(*row) for row in results]
         except Exception as e:
             database_logger.error(f"Failed to get table info for {table_name}: {e}")
             return []
     
     def close_connections(self):
-        """Close all thread-local connections"""
+        """Close every writer and pooled reader connection"""
         with self._lock:
-            if hasattr(self._connections, '__dict__'):
-                for conn in self._connections.__dict__.values():
-                    try:
-                        conn.close()
-                    except Exception:
-                        pass
-                self._connections.__dict__.clear()
-                database_logger.debug("Closed all database connections")
+            for conn in list(self._all_connections):
+                try:
+                    conn.close()
+                except Exception:
+                    pass
+            self._all_connections.clear()
+            self._pools.clear()
+            database_logger.debug("Closed all database connections")
 
 
 # Global database manager instance
@@ -4,21 +4,77 @@ Database schema migration script to fix missing columns and schema mismatches
 
 import sqlite3
 import os
+import shutil
+from contextlib import closing, contextmanager
 from pathlib import Path
-from typing import List, Tuple
+from typing import Dict, Generator, List, Tuple
 from datetime import datetime
 
 from ..config.settings import settings
 from ..utils.logging import monitoring_logger
 
 
+# Canonical tool_metrics schema that the monitoring code expects
+EXPECTED_TOOL_METRICS_COLUMNS: List[Tuple[str, str]] = [
+    ("id", "INTEGER PRIMARY KEY AUTOINCREMENT"),
+    ("conversation_id", "TEXT"),
+    ("timestamp", "DATETIME DEFAULT CURRENT_TIMESTAMP"),
+    ("tool_name", "TEXT"),
+    ("execution_time_ms", "REAL"),
+    ("success", "BOOLEAN"),
+    ("error_message", "TEXT"),
+    ("token_count", "INTEGER"),
+    ("estimated_tokens", "INTEGER"),
+    ("input_params", "TEXT"),
+    ("output_preview", "TEXT"),
+    ("dax_query", "TEXT"),
+    ("retry_count", "INTEGER DEFAULT 0"),
+    ("technical_success", "BOOLEAN"),
+    ("quality_success", "BOOLEAN"),
+    ("quality_score", "REAL"),
+    ("quality_issues", "TEXT")
+]
+
+# ALTER TABLE ADD COLUMN cannot add a primary key or a non-constant default
+ADDABLE_TOOL_METRICS_COLUMNS: List[Tuple[str, str]] = [
+    (col_name, col_type) for col_name, col_type in EXPECTED_TOOL_METRICS_COLUMNS
+    if "PRIMARY KEY" not in col_type and "CURRENT_TIMESTAMP" not in col_type
+]
+
+
 class DatabaseMigration:
     """Handle database schema migrations and fixes"""
     
+    # Column lists keyed by (db_path, table_name, PRAGMA schema_version); any schema
+    # change bumps the version, so stale entries are never hit
+    _column_cache: Dict[Tuple[str, str, int], List[str]] = {}
+    
     def __init__(self):
         self.metrics_db_path = settings.metrics_db_path
         self.conversation_db_path = settings.conversation_db_path
         self.backup_suffix = datetime.now().strftime("_%Y%m%d_%H%M%S.backup")
+        # Connections held open for the duration of run_migration, keyed by db path
+        self._held_connections: Dict[str, sqlite3.Connection] = {}
+    
+    @contextmanager
+    def _connection(self, db_path) -> Generator[sqlite3.Connection, None, None]:
+        """Yield the connection held by the running migration, or a short-lived one"""
+        conn = self._held_connections.get(str(db_path))
+        if conn is not None:
+            yield conn
+            return
+        with closing(sqlite3.connect(db_path)) as conn:
+            yield conn
+    
+    def _backup_database(self, db_path: Path, backup_path: str) -> None:
+        """Copy a database with the SQLite online backup API, falling back to a file copy"""
+        try:
+            # Copies pages under a read transaction, so a concurrent writer cannot tear the copy
+            with self._connection(db_path) as src, closing(sqlite3.connect(backup_path)) as dst:
+                src.backup(dst, pages=1024)
+        except sqlite3.DatabaseError as e:
+            monitoring_logger.warning(f"Online backup of {db_path} failed ({e}), copying the file instead")
+            shutil.copyfile(db_path, backup_path)
     
     def backup_databases(self) -> bool:
         """Create backup copies of databases before migration"""
@@ -26,15 +82,13 @@ class DatabaseMigration:
             # Backup metrics DB
             if os.path.exists(self.metrics_db_path):
                 metrics_backup = str(self.metrics_db_path) + self.backup_suffix
-                with open(self.metrics_db_path, 'rb') as src, open(metrics_backup, 'wb') as dst:
-                    dst.write(src.read())
+                self._backup_database(self.metrics_db_path, metrics_backup)
                 monitoring_logger.info(f"Backed up metrics DB to: {metrics_backup}")
             
             # Backup conversation DB  
             if os.path.exists(self.conversation_db_path):
                 conv_backup = str(self.conversation_db_path) + self.backup_suffix
-                with open(self.conversation_db_path, 'rb') as src, open(conv_backup, 'wb') as dst:
-                    dst.write(src.read())
+                self._backup_database(self.conversation_db_path, conv_backup)
                 monitoring_logger.info(f"Backed up conversation DB to: {conv_backup}")
             
             return True
@@ -45,9 +99,15 @@ class DatabaseMigration:
     def get_table_columns(self, db_path: str, table_name: str) -> List[str]:
         """Get current columns in a table"""
         try:
-            with sqlite3.connect(db_path) as conn:
-                cursor = conn.execute(f"PRAGMA table_info({table_name})")
-                return [row[1] for row in cursor.fetchall()]
+            with self._connection(db_path) as conn:
+                schema_version = conn.execute("PRAGMA schema_version").fetchone()[0]
+                cache_key = (str(db_path), table_name, schema_version)
+                columns = self._column_cache.get(cache_key)
+                if columns is None:
+                    cursor = conn.execute(f"PRAGMA table_info({table_name})")
+                    columns = [row[1] for row in cursor.fetchall()]
+                    self._column_cache[cache_key] = columns
+                return columns
         except Exception as e:
             monitoring_logger.warning(f"Could not get columns for {table_name}: {e}")
             return []
@@ -55,23 +115,37 @@ class DatabaseMigration:
     def add_missing_columns(self, db_path: str, table_name: str, expected_columns: List[Tuple[str, str]]) -> bool:
         """Add missing columns to existing table"""
         try:
-            current_columns = self.get_table_columns(db_path, table_name)
-            missing_columns = []
-            
-            for col_name, col_type in expected_columns:
-                if col_name not in current_columns:
-                    missing_columns.append((col_name, col_type))
+            current_columns = set(self.get_table_columns(db_path, table_name))
+            missing_columns = [
+                (col_name, col_type) for col_name, col_type in expected_columns
+                if col_name not in current_columns
+            ]
             
             if not missing_columns:
                 monitoring_logger.info(f"Table {table_name} schema is up to date")
                 return True
             
-            with sqlite3.connect(db_path) as conn:
-                for col_name, col_type in missing_columns:
-                    alter_sql = f"ALTER TABLE {table_name} ADD COLUMN {col_name} {col_type}"
-                    monitoring_logger.info(f"Adding column: {alter_sql}")
-                    conn.execute(alter_sql)
-                conn.commit()
+            alter_statements = [
+                f"ALTER TABLE {table_name} ADD COLUMN {col_name} {col_type};"
+                for col_name, col_type in missing_columns
+            ]
+            for alter_sql in alter_statements:
+                monitoring_logger.info(f"Adding column: {alter_sql}")
+            
+            with self._connection(db_path) as conn:
+                if settings.sqlite_tuning_enabled:
+                    conn.execute("PRAGMA journal_mode=WAL")
+                    conn.execute("PRAGMA synchronous=NORMAL")
+                # All ALTERs in one transaction: a single commit instead of one per column
+                try:
+                    conn.executescript("BEGIN IMMEDIATE;\n" + "\n".join(alter_statements) + "\nCOMMIT;")
+                except sqlite3.Error:
+                    # A held connection outlives this call, so undo the partial script here
+                    if conn.in_transaction:
+                        conn.rollback()
+                    raise
+                # Fresh planner statistics for the reshaped table
+                conn.execute(f"ANALYZE {table_name}")
                 
             monitoring_logger.info(f"Added {len(missing_columns)} columns to {table_name}")
             return True
@@ -82,58 +156,19 @@ class DatabaseMigration:
     
     def fix_tool_metrics_schema(self) -> bool:
         """Fix the tool_metrics table schema to match code expectations"""
-        expected_columns = [
-            # Existing columns (should not be added)
-            ("id", "INTEGER PRIMARY KEY AUTOINCREMENT"),
-            ("conversation_id", "TEXT"),
-            ("timestamp", "DATETIME DEFAULT CURRENT_TIMESTAMP"),
-            ("tool_name", "TEXT"),
-            ("execution_time_ms", "REAL"),
-            ("success", "BOOLEAN"),
-            ("error_message", "TEXT"),
-            ("token_count", "INTEGER"),
-            
-            # Missing columns that need to be added
-            ("estimated_tokens", "INTEGER"),
-            ("input_params", "TEXT"),
-            ("output_preview", "TEXT"),
-            ("dax_query", "TEXT"),
-            ("retry_count", "INTEGER DEFAULT 0"),
-            ("technical_success", "BOOLEAN"),
-            ("quality_success", "BOOLEAN"),
-            ("quality_score", "REAL"),
-            ("quality_issues", "TEXT")
-        ]
-        
-        # Only add the missing columns (from estimated_tokens onwards)
-        missing_columns = [
-            ("estimated_tokens", "INTEGER"),
-            ("input_params", "TEXT"),
-            ("output_preview", "TEXT"),
-            ("dax_query", "TEXT"),
-            ("retry_count", "INTEGER DEFAULT 0"),
-            ("technical_success", "BOOLEAN"),
-            ("quality_success", "BOOLEAN"),
-            ("quality_score", "REAL"),
-            ("quality_issues", "TEXT")
-        ]
-        
-        return self.add_missing_columns(self.metrics_db_path, "tool_metrics", missing_columns)
+        # add_missing_columns diffs against the live table, so re-runs only add what is absent
+        return self.add_missing_columns(self.metrics_db_path, "tool_metrics", ADDABLE_TOOL_METRICS_COLUMNS)
     
     def verify_schema_consistency(self) -> bool:
         """Verify that database schemas match code expectations"""
         try:
             # Check tool_metrics table
-            tool_metrics_columns = self.get_table_columns(self.metrics_db_path, "tool_metrics")
-            expected_tool_columns = [
-                "id", "conversation_id", "timestamp", "tool_name", "execution_time_ms", 
-                "success", "error_message", "token_count", "estimated_tokens", 
-                "input_params", "output_preview", "dax_query", "retry_count",
-                "technical_success", "quality_success", "quality_score", "quality_issues"
+            tool_metrics_columns = set(self.get_table_columns(self.metrics_db_path, "tool_metrics"))
+            missing_tool_columns = [
+                col_name for col_name, _ in EXPECTED_TOOL_METRICS_COLUMNS
+                if col_name not in tool_metrics_columns
             ]
             
-            missing_tool_columns = [col for col in expected_tool_columns if col not in tool_metrics_columns]
-            
             if missing_tool_columns:
                 monitoring_logger.error(f"tool_metrics still missing columns: {missing_tool_columns}")
                 return False
@@ -145,11 +180,29 @@ class DatabaseMigration:
             monitoring_logger.error(f"Schema verification failed: {e}")
             return False
     
+    def optimize_databases(self) -> None:
+        """Let SQLite refresh planner statistics (PRAGMA optimize) on the migrated databases"""
+        for db_path in (self.metrics_db_path, self.conversation_db_path):
+            if not os.path.exists(db_path):
+                continue
+            try:
+                with self._connection(db_path) as conn:
+                    conn.execute("PRAGMA optimize")
+            except Exception as e:
+                monitoring_logger.warning(f"PRAGMA optimize failed for {db_path}: {e}")
+    
     def run_migration(self) -> bool:
         """Run the complete migration process"""
         try:
             monitoring_logger.info("Starting database schema migration...")
             
+            # One connection per existing database for the whole run, so each schema is parsed once
+            self._held_connections = {
+                str(db_path): sqlite3.connect(db_path)
+                for db_path in (self.metrics_db_path, self.conversation_db_path)
+                if os.path.exists(db_path)
+            }
+            
             # 1. Backup databases
             if not self.backup_databases():
                 monitoring_logger.error("Migration aborted: backup failed")
@@ -165,12 +218,19 @@ class DatabaseMigration:
                 monitoring_logger.error("Migration failed: schema verification failed")
                 return False
             
+            # 4. Refresh query planner statistics
+            self.optimize_databases()
+            
             monitoring_logger.info("✅ Database migration completed successfully")
             return True
             
         except Exception as e:
             monitoring_logger.error(f"Migration failed with exception: {e}")
             return False
+        finally:
+            for conn in self._held_connections.values():
+                conn.close()
+            self._held_connections = {}
 
 
 def migrate_database_schema():
@@ -23,13 +23,30 @@ from .mcp.tools.model_discovery_tools import register_model_discovery_tools
 from .mcp.tools.financial_statement_tools import register_financial_statement_tools
 from .context.resources import register_context_resources
 
+# Deployment environment, fixed for the process lifetime
+AUTH_ENABLED = os.environ.get('AUTH_ENABLED', '').lower() in ('true', '1', 'yes')
+AZURE_HOSTNAME = os.environ.get('WEBSITE_HOSTNAME')
+IS_AZURE = bool(AZURE_HOSTNAME)
+
+# Static parts of the health check responses; only per-request fields are filled in
+_HEALTH_BASE = {
+    "status": "healthy",
+    "service": "Power BI MCP Finance Server",
+    "version": "1.0.0",
+    "authentication": AUTH_ENABLED,
+}
+_DETAILED_HEALTH_BASE = {
+    "status": "healthy",
+    "environment": "production" if IS_AZURE else "development",
+}
+
 # Initialize server
 mcp = FastMCP("powerbi-financial-server")
 logger = get_logger("main")
 
 # Initialize Flask app for OAuth endpoints (if authentication is enabled)
 flask_app = None
-if os.environ.get('AUTH_ENABLED', '').lower() in ('true', '1', 'yes'):
+if AUTH_ENABLED:
     flask_app = Flask(__name__)
     flask_app.secret_key = os.environ.get('FLASK_SECRET_KEY', os.urandom(24))
     CORS(flask_app)
@@ -41,9 +58,7 @@ if os.environ.get('AUTH_ENABLED', '').lower() in ('true', '1', 'yes'):
 
 def setup_authentication():
     """Setup and validate authentication"""
-    auth_enabled = os.environ.get('AUTH_ENABLED', '').lower() in ('true', '1', 'yes')
-    
-    if auth_enabled:
+    if AUTH_ENABLED:
         logger.info("🔐 Web authentication enabled")
         oauth_instance = get_oauth_instance()
         if oauth_instance._is_configured():
@@ -95,7 +110,8 @@ def register_all_tools():
     """Register all MCP tools"""
     logger.info("Registering MCP tools...")
     
-    # Register all tool modules
+    # Register all tool modules. Registration only decorates closures in memory (no I/O),
+    # so it stays sequential - FastMCP's tool registry is not guarded for concurrent writes
     register_workspace_tools(mcp)
     register_financial_tools(mcp)
     register_query_tools(mcp)
@@ -125,13 +141,7 @@ def create_flask_app():
     @flask_app.route('/')
     def health_check():
         """Health check endpoint for Azure"""
-        return {
-            "status": "healthy",
-            "service": "Power BI MCP Finance Server",
-            "version": "1.0.0",
-            "authentication": os.environ.get('AUTH_ENABLED', 'false').lower() in ('true', '1', 'yes'),
-            "timestamp": datetime.utcnow().isoformat()
-        }
+        return {**_HEALTH_BASE, "timestamp": datetime.utcnow().isoformat()}
     
     @flask_app.route('/health')
     def health():
@@ -140,10 +150,9 @@ def create_flask_app():
         token_info = token_manager.get_token_info()
         
         return {
-            "status": "healthy",
+            **_DETAILED_HEALTH_BASE,
             "powerbi_auth": token_info.get('status', 'unknown'),
             "oauth_configured": get_oauth_instance()._is_configured() if flask_app else False,
-            "environment": "production" if os.environ.get('WEBSITE_HOSTNAME') else "development"
         }
     
     return flask_app
@@ -154,9 +163,8 @@ def main():
     logger.info("Starting Enhanced Power BI MCP Server")
     
     # Check if running on Azure
-    is_azure = bool(os.environ.get('WEBSITE_HOSTNAME'))
-    if is_azure:
-        logger.info(f"🌐 Running on Azure Web App: {os.environ.get('WEBSITE_HOSTNAME')}")
+    if IS_AZURE:
+        logger.info(f"🌐 Running on Azure Web App: {AZURE_HOSTNAME}")
     else:
         logger.info("💻 Running locally")
     
@@ -164,23 +172,16 @@ def main():
     logger.info(f"Shared databases: {settings.shared_dir}")
     
     try:
-        # Setup authentication
-        setup_authentication()
-        
-        # Register tools
-        register_all_tools()
-        
-        # Register context resources for automatic injection  
-        register_context_system()
+        # Setup, registration and Flask routes normally already ran at import via get_app()
+        azure_app = get_app()
         
         # For Azure deployment, return Flask app for gunicorn
-        if is_azure and flask_app:
+        if IS_AZURE and flask_app:
             logger.info("🚀 Configured for Azure Web App deployment")
-            return create_flask_app()
+            return azure_app
         
         # For local development, run both servers
-        auth_enabled = os.environ.get('AUTH_ENABLED', '').lower() in ('true', '1', 'yes')
-        if auth_enabled and flask_app:
+        if AUTH_ENABLED and flask_app:
             import threading
             def run_flask():
                 port = int(os.environ.get('AUTH_PORT', 8000))
@@ -206,16 +207,21 @@ def main():
 
 # Create Flask app instance for gunicorn
 app = None
+# Set once setup and registration have run; app alone can't tell, it stays None without auth
+_INITIALIZED = False
 
 def get_app():
     """Get or create the Flask app for gunicorn"""
-    global app
-    if app is None:
-        # Initialize the application
-        setup_authentication()
-        register_all_tools()
-        register_context_system()
-        app = create_flask_app()
+    global app, _INITIALIZED
+    if _INITIALIZED:
+        return app
+    
+    # Initialize the application
+    setup_authentication()
+    register_all_tools()
+    register_context_system()
+    app = create_flask_app()
+    _INITIALIZED = True
     return app
 
 # For gunicorn deployment
@@ -4,18 +4,35 @@ Decorators for MCP tools with monitoring and tracking
 
 import time
 from functools import wraps
-from typing import Callable, Any
+from typing import Callable, Any, Optional
 
 from ..monitoring.tracker import conversation_tracker, log_conversation_simple
 from ..monitoring.metrics import performance_monitor
 from ..utils.logging import mcp_logger
 
 
-def enhanced_tool(func: Callable) -> Callable:
-    """Enhanced decorator for comprehensive monitoring and conversation tracking"""
+def _output_preview(output: Any) -> Optional[str]:
+    """First 500 characters of a tool's output (strings are sliced without a str() copy)"""
+    if not output:
+        return None
+    if isinstance(output, str):
+        return output[:500]
+    return str(output)[:500]
+
+
+def enhanced_tool(func: Optional[Callable] = None, *, track_metrics: bool = True,
+                  track_conversation: bool = True) -> Callable:
+    """Enhanced decorator for comprehensive monitoring and conversation tracking
+    
+    Usable bare (@enhanced_tool) or with options, e.g. @enhanced_tool(track_conversation=False)
+    for cheap tools whose calls are not worth recording in the conversation database.
+    """
+    if func is None:
+        return lambda f: enhanced_tool(f, track_metrics=track_metrics, track_conversation=track_conversation)
+    
     @wraps(func)
     def wrapper(**kwargs):
-        start_time = time.time()
+        start_ns = time.perf_counter_ns()  # Monotonic, unaffected by wall-clock adjustments
         success = True
         error_message = None
         output = None
@@ -23,9 +40,6 @@ def enhanced_tool(func: Callable) -> Callable:
         # Log start of tool execution
         mcp_logger.debug(f"Starting tool: {func.__name__}")
         
-        # Simple conversation logging for MCP stateless nature
-        log_conversation_simple(func.__name__, kwargs, success=True)
-        
         try:
             # Execute the function
             output = func(**kwargs)
@@ -44,29 +58,36 @@ def enhanced_tool(func: Callable) -> Callable:
             return f"Error: {str(e)}"
             
         finally:
-            elapsed_ms = (time.time() - start_time) * 1000
+            elapsed_ms = (time.perf_counter_ns() - start_ns) / 1_000_000
+            # Both writers share one preview
+            output_preview = _output_preview(output)
             
             # Log execution metrics
-            performance_monitor.log_tool_execution(
-                tool_name=func.__name__,
-                execution_time_ms=elapsed_ms,
-                success=success,
-                input_params=kwargs,
-                output_preview=str(output)[:500] if output else None,
-                error_message=error_message,
-                conversation_id=conversation_tracker.current_conversation_id
-            )
+            if track_metrics:
+                performance_monitor.log_tool_execution(
+                    tool_name=func.__name__,
+                    execution_time_ms=elapsed_ms,
+                    success=success,
+                    input_params=kwargs,
+                    output_preview=output_preview,
+                    error_message=error_message,
+                    conversation_id=conversation_tracker.current_conversation_id
+                )
             
-            # Log to conversation tracker
-            conversation_tracker.add_tool_execution(
-                tool_name=func.__name__,
-                success=success,
-                execution_time_ms=elapsed_ms,
-                input_params=kwargs,
-                error_msg=error_message,
-                output_preview=str(output)[:500] if output else None
-            )
+            if track_conversation:
+                # Simple conversation logging for MCP stateless nature
+                log_conversation_simple(func.__name__, kwargs, success=success, error=error_message)
+                
+                # Log to conversation tracker
+                conversation_tracker.add_tool_execution(
+                    tool_name=func.__name__,
+                    success=success,
+                    execution_time_ms=elapsed_ms,
+                    input_params=kwargs,
+                    error_msg=error_message,
+                    output_preview=output_preview
+                )
             
             mcp_logger.debug(f"Tool {func.__name__} completed in {elapsed_ms:.1f}ms")
     
-    return wrapper
\ No newline at end of file
+    return wrapper
@@ -5,7 +5,8 @@ MCP tools for monitoring and performance statistics
 import sqlite3
 from fastmcp import FastMCP
 
-from ...database.connection import get_conversation_db, get_metrics_db
+from ...config.settings import settings
+from ...database.connection import db_manager
 from ...utils.logging import mcp_logger
 
 
@@ -22,8 +23,11 @@ def register_monitoring_tools(mcp: FastMCP):
         try:
             mcp_logger.info("Retrieving performance statistics")
             
-            with get_conversation_db() as conv_conn:
-                cursor = conv_conn.cursor()
+            # One read connection serves both databases, with metrics attached
+            with db_manager.get_attached_read_connection(
+                settings.conversation_db_path, {'metrics': settings.metrics_db_path}
+            ) as conn:
+                cursor = conn.cursor()
                 
                 # Get conversation patterns
                 cursor.execute("""
@@ -35,22 +39,16 @@ def register_monitoring_tools(mcp: FastMCP):
                     WHERE timestamp > datetime('now', '-24 hours')
                 """)
                 conv_stats = cursor.fetchone()
-            
-            with get_metrics_db() as metrics_conn:
-                cursor = metrics_conn.cursor()
                 
                 # Get tool confusion patterns
                 cursor.execute("""
                     SELECT wrong_tool_selected, correct_tool, COUNT(*) as frequency
-                    FROM tool_confusion
+                    FROM metrics.tool_confusion
                     GROUP BY wrong_tool_selected, correct_tool
                     ORDER BY frequency DESC
                     LIMIT 5
                 """)
                 confusions = cursor.fetchall()
-            
-            with get_conversation_db() as conv_conn:
-                cursor = conv_conn.cursor()
                 
                 # Get most efficient query patterns
                 cursor.execute("""
@@ -88,7 +86,6 @@ def register_monitoring_tools(mcp: FastMCP):
             else:
                 output += "• No patterns analyzed yet\n"
             
-            from ...config.settings import settings
             output += f"\n💾 Databases:\n"
             output += f"• Conversation DB: {settings.conversation_db_path}\n"
             output += f"• Metrics DB: {settings.metrics_db_path}\n"
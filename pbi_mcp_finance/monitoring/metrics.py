@@ -4,13 +4,28 @@ Performance metrics and monitoring
 
 import json
 from datetime import datetime
-from typing import Dict, Any, Optional
+from typing import Dict, Any, List, Optional
 
-from ..database.connection import get_metrics_db
+from ..database.connection import db_manager, get_metrics_db
 from ..config.settings import settings
 from ..utils.logging import monitoring_logger
 
 
+_TOOL_METRICS_INSERT_SQL = """
+    INSERT INTO tool_metrics 
+    (conversation_id, tool_name, execution_time_ms, success, estimated_tokens, 
+     input_params, output_preview, error_message, dax_query, retry_count,
+     technical_success, quality_success, quality_score, quality_issues)
+    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+"""
+
+_TOKEN_USAGE_INSERT_SQL = """
+    INSERT INTO token_usage 
+    (conversation_id, tool_name, input_tokens, output_tokens, total_tokens, cost_estimate)
+    VALUES (?, ?, ?, ?, ?, ?)
+"""
+
+
 class PerformanceMonitor:
     """Enhanced monitoring for self-improving system"""
     
@@ -152,46 +167,61 @@ class PerformanceMonitor:
                           technical_success: Optional[bool] = None, quality_success: Optional[bool] = None,
                           quality_score: Optional[float] = None, quality_issues: Optional[list] = None) -> None:
         """Log tool execution with enhanced details"""
+        self.log_tool_executions([{
+            'tool_name': tool_name, 'execution_time_ms': execution_time_ms, 'success': success,
+            'input_params': input_params, 'output_preview': output_preview,
+            'error_message': error_message, 'dax_query': dax_query, 'retry_count': retry_count,
+            'conversation_id': conversation_id, 'technical_success': technical_success,
+            'quality_success': quality_success, 'quality_score': quality_score,
+            'quality_issues': quality_issues
+        }])
+    
+    def log_tool_executions(self, executions: List[Dict[str, Any]]) -> None:
+        """Log several tool executions (log_tool_execution keyword dicts) in one transaction"""
         try:
-            # Estimate tokens
-            input_tokens = self.estimate_tokens(json.dumps(input_params) if input_params else "")
-            output_tokens = self.estimate_tokens(output_preview)
-            total_tokens = input_tokens + output_tokens
-            self.estimated_tokens_total += total_tokens
-            
-            with get_metrics_db() as conn:
-                conn.execute("""
-                    INSERT INTO tool_metrics 
-                    (conversation_id, tool_name, execution_time_ms, success, estimated_tokens, 
-                     input_params, output_preview, error_message, dax_query, retry_count,
-                     technical_success, quality_success, quality_score, quality_issues)
-                    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-                """, (
-                    conversation_id,
-                    tool_name, execution_time_ms, success, total_tokens,
-                    json.dumps(input_params) if input_params else None,
+            tool_rows = []
+            token_rows = []
+            for execution in executions:
+                success = execution['success']
+                input_params = execution.get('input_params')
+                output_preview = execution.get('output_preview')
+                technical_success = execution.get('technical_success')
+                quality_success = execution.get('quality_success')
+                quality_score = execution.get('quality_score')
+                quality_issues = execution.get('quality_issues')
+                
+                # Estimate tokens
+                input_json = json.dumps(input_params) if input_params else None
+                input_tokens = self.estimate_tokens(input_json or "")
+                output_tokens = self.estimate_tokens(output_preview)
+                total_tokens = input_tokens + output_tokens
+                self.estimated_tokens_total += total_tokens
+                
+                tool_rows.append((
+                    execution.get('conversation_id'),
+                    execution['tool_name'], execution['execution_time_ms'], success, total_tokens,
+                    input_json,
                     output_preview[:500] if output_preview else None,
-                    error_message, dax_query, retry_count,
+                    execution.get('error_message'), execution.get('dax_query'),
+                    execution.get('retry_count', 0),
                     technical_success if technical_success is not None else success,
                     quality_success if quality_success is not None else success,
                     quality_score if quality_score is not None else 1.0,
                     json.dumps(quality_issues) if quality_issues else None
                 ))
-                
                 # Also log token usage
-                conn.execute("""
-                    INSERT INTO token_usage 
-                    (conversation_id, tool_name, input_tokens, output_tokens, total_tokens, cost_estimate)
-                    VALUES (?, ?, ?, ?, ?, ?)
-                """, (
-                    conversation_id,
-                    tool_name, input_tokens, output_tokens, total_tokens, 
+                token_rows.append((
+                    execution.get('conversation_id'),
+                    execution['tool_name'], input_tokens, output_tokens, total_tokens, 
                     total_tokens * 0.00002  # Rough cost estimate
                 ))
-                
-                conn.commit()
-                self.tool_call_count += 1
-                monitoring_logger.debug(f"Logged tool execution: {tool_name} ({execution_time_ms:.1f}ms)")
+            
+            db_manager.execute_transaction(settings.metrics_db_path, [
+                (_TOOL_METRICS_INSERT_SQL, tool_rows),
+                (_TOKEN_USAGE_INSERT_SQL, token_rows)
+            ])
+            self.tool_call_count += len(executions)
+            monitoring_logger.debug(f"Logged {len(executions)} tool executions")
                 
         except Exception as e:
             monitoring_logger.error(f"Error logging tool execution: {e}")
@@ -4,12 +4,14 @@ Power BI API client for financial data access
 
 import time
 import requests
+from requests.adapters import HTTPAdapter
 from typing import Dict, Any, Optional, List
 
 from ..config.settings import settings
 from ..auth.oauth_manager import get_powerbi_token, get_token_manager
 from ..auth import get_auth_token
 from ..utils.logging import powerbi_logger
+from ..utils.serialization import json_loads
 from ..utils.exceptions import (
     PowerBIError, AuthenticationError, WorkspaceNotFoundError, 
     DatasetNotFoundError, DAXQueryError
@@ -23,6 +25,11 @@ class PowerBIClient:
     def __init__(self):
         self.api_base_url = settings.powerbi_api_base_url
         self.fabric_api_base_url = settings.fabric_api_base_url
+        
+        # Persistent session so repeated API calls reuse pooled keep-alive connections
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=10, pool_maxsize=10)
+        self.session.mount("https://", adapter)
     
     def get_auth_headers(self) -> Dict[str, str]:
         """Get authorization headers with fresh token"""
@@ -65,9 +72,9 @@ class PowerBIClient:
             
             # First attempt
             if method == "GET":
-                response = requests.get(url, headers=headers, timeout=30)
+                response = self.session.get(url, headers=headers, timeout=30)
             else:
-                response = requests.post(url, headers=headers, json=data, timeout=30)
+                response = self.session.post(url, headers=headers, json=data, timeout=30)
             
             # If token expired, try to refresh and retry once
             if response.status_code == 401 or (response.status_code == 403 and "TokenExpired" in response.text):
@@ -79,9 +86,9 @@ class PowerBIClient:
                 
                 # Retry the request with fresh token
                 if method == "GET":
-                    response = requests.get(url, headers=headers, timeout=30)
+                    response = self.session.get(url, headers=headers, timeout=30)
                 else:
-                    response = requests.post(url, headers=headers, json=data, timeout=30)
+                    response = self.session.post(url, headers=headers, json=data, timeout=30)
             
             # Calculate metrics
             elapsed_ms = (time.time() - start_time) * 1000
@@ -112,7 +119,8 @@ class PowerBIClient:
                 else:
                     raise PowerBIError(error_message)
             
-            return response.json()
+            # Decode raw bytes directly - faster than response.json() for large DAX results
+            return json_loads(response.content)
             
         except requests.exceptions.RequestException as e:
             elapsed_ms = (time.time() - start_time) * 1000
@@ -207,7 +215,7 @@ class PowerBIClient:
             url = f"{self.fabric_api_base_url}/workspaces/{workspace_id}/semanticModels/{dataset_id}/getDefinition"
             
             # This might be a long-running operation
-            response = requests.post(url, headers=self.get_auth_headers(), timeout=30)
+            response = self.session.post(url, headers=self.get_auth_headers(), timeout=30)
             
             # Handle long-running operation
             if response.status_code == 202:
@@ -234,14 +242,14 @@ class PowerBIClient:
             retry_count += 1
             
             try:
-                response = requests.get(location_url, headers=headers, timeout=30)
+                response = self.session.get(location_url, headers=headers, timeout=30)
                 
                 if response.ok:
                     data = response.json()
                     status = data.get('status', '')
                     
                     if status == 'Succeeded':
-                        result_response = requests.get(f"{location_url}/result", headers=headers, timeout=30)
+                        result_response = self.session.get(f"{location_url}/result", headers=headers, timeout=30)
                         if result_response.ok:
                             return result_response.json()
                         else:
@@ -49,6 +49,10 @@ class PowerBILogger:
         except Exception:
             return False
     
+    def is_enabled_for(self, level: int) -> bool:
+        """Check if a level would be emitted, to skip building costly messages"""
+        return self.logger.isEnabledFor(level)
+    
     def debug(self, message: str, **kwargs):
         self.logger.debug(message, **kwargs)
     
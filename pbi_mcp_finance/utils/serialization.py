@@ -0,0 +1,60 @@
+"""
+JSON serialization helpers for Power BI MCP Finance Server
+Uses orjson when available, falling back to the standard library json module
+"""
+
+import json
+import os
+import tempfile
+from pathlib import Path
+from typing import Any, Optional, Tuple, Union
+
+try:
+    import orjson
+except ImportError:  # orjson is optional - stdlib json is used instead
+    orjson = None
+
+
+def json_loads(data: Union[str, bytes, bytearray]) -> Any:
+    """Parse JSON from str or bytes"""
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
+
+
+def json_dumps_bytes(obj: Any, sort_keys: bool = False) -> bytes:
+    """Serialize an object to compact UTF-8 JSON bytes"""
+    if orjson is not None:
+        option = orjson.OPT_NON_STR_KEYS
+        if sort_keys:
+            option |= orjson.OPT_SORT_KEYS
+        return orjson.dumps(obj, default=str, option=option)
+    return json.dumps(
+        obj, default=str, sort_keys=sort_keys, separators=(',', ':'), ensure_ascii=False
+    ).encode('utf-8')
+
+
+def write_json_atomic(path: Path, obj: Any) -> None:
+    """Write compact JSON to a file via temp file + rename so readers never see partial writes"""
+    data = json_dumps_bytes(obj)
+    # Unique temp file in the same directory so concurrent writers never share it
+    fd, tmp_path = tempfile.mkstemp(dir=path.parent, prefix=f'.{path.name}.', suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+    except BaseException:
+        try:
+            os.unlink(tmp_path)
+        except OSError:
+            pass
+        raise
+
+
+def file_fingerprint(path: Path) -> Optional[Tuple[int, int]]:
+    """Return (mtime_ns, size) for a file, or None if it does not exist"""
+    try:
+        stat = path.stat()
+    except FileNotFoundError:
+        return None
+    return stat.st_mtime_ns, stat.st_size